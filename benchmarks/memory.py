@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Measure the memory of reloaded places, regular and compact.
+
+The given number of places (default 20000) is saved to a temporary
+file.json and reloaded once with each layout. tracemalloc reports the
+bytes held per place once reload() and the class index are done, then
+again after a save() and a str() of every place, which must not make
+compact places grow.
+
+Usage: python3 benchmarks/memory.py [count]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from models.engine.FileStorage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def measure(storage, count, compact):
+    """Return the bytes per place after reload() and after a save() and
+    a str() of every place, building compact places if compact is set.
+
+    count() builds the class index first, since save() would otherwise
+    add it to the second figure.
+    """
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__compact = compact
+    tracemalloc.start()
+    storage.reload()
+    storage.count()
+    loaded = tracemalloc.get_traced_memory()[0]
+    storage.save()
+    for obj in storage.all().values():
+        str(obj)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    FileStorage._FileStorage__objects = {}
+    return loaded // count, used // count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    storage = FileStorage()
+    with tempfile.TemporaryDirectory() as tmp:
+        FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+        FileStorage._FileStorage__objects = {}
+        for i in range(count):
+            place = Place()
+            place.city_id = "city {}".format(i % 100)
+            place.user_id = "user {}".format(i % 1000)
+            place.name = "Place {}".format(i)
+            place.description = "A place to stay"
+            place.price_by_night = i % 300
+        storage.save()
+        for compact in (False, True):
+            loaded, used = measure(storage, count, compact)
+            print("{:8} {} bytes per place after reload, {} after save "
+                  "and str".format("compact" if compact else "regular",
+                                   loaded, used))
+
+
+if __name__ == "__main__":
+    main()
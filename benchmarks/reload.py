@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Time FileStorage.reload() on a generated file.json.
+
+The file holds the given number of objects (default 1000000), spread
+evenly over six model classes with five attributes each. It is written
+to a temporary directory, so the file.json of the working directory is
+left alone.
+
+Usage: python3 benchmarks/reload.py [count]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from models.engine.FileStorage import FileStorage  # noqa: E402
+
+ATTRIBUTES = {
+    "User": ("email", "password", "first_name", "last_name", "note"),
+    "State": ("name", "code", "region", "country", "note"),
+    "City": ("state_id", "name", "code", "region", "note"),
+    "Amenity": ("name", "kind", "icon", "label", "note"),
+    "Place": ("city_id", "user_id", "name", "description",
+              "price_by_night"),
+    "Review": ("place_id", "user_id", "text", "title", "note"),
+}
+
+
+def write_file(path, count):
+    """Write count objects to path in the layout FileStorage saves."""
+    now = datetime.now().isoformat()
+    names = list(ATTRIBUTES)
+    with open(path, "w") as f:
+        f.write("{")
+        for i in range(count):
+            cls_name = names[i % len(names)]
+            obj_id = str(uuid.uuid4())
+            o = {"__class__": cls_name, "id": obj_id,
+                 "created_at": now, "updated_at": now}
+            for name in ATTRIBUTES[cls_name]:
+                o[name] = "{} {}".format(name, i)
+            if cls_name == "Place":
+                o["price_by_night"] = i
+            f.write("\n" if i == 0 else ",\n")
+            f.write(json.dumps("{}.{}".format(cls_name, obj_id)))
+            f.write(":")
+            f.write(json.dumps(o))
+        f.write("\n}\n")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        write_file(path, count)
+        FileStorage._FileStorage__file_path = path
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        FileStorage().reload()
+        elapsed = time.perf_counter() - start
+        loaded = len(FileStorage().all())
+        FileStorage._FileStorage__objects = {}
+    print("reloaded {} objects in {:.2f}s".format(loaded, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,9 @@ Define the AirBnB clone Console
 """
 import cmd
 import re
+from ast import literal_eval
 from shlex import split
-from models.base_model import BaseModel
+from models.base_model import classes
 from models import storage
 import models.city
 import models.amenity
@@ -23,14 +24,14 @@ def parser(arg):
             return [x.strip(",") for x in split(arg)]
         else:
             lexicon = split(arg[:square_brackets.span()[0]])
-            re.search = [x.strip(",") for x in lexicon]
-            re.search.append(square_brackets.group())
-            return re.search
+            retl = [x.strip(",") for x in lexicon]
+            retl.append(square_brackets.group())
+            return retl
     else:
         lexicon = split(arg[:curly_brackets.span()[0]])
-        re.search = [x.strip(",") for x in lexicon]
-        re.search.append(curly_brackets.group())
-        return re.search
+        retl = [x.strip(",") for x in lexicon]
+        retl.append(curly_brackets.group())
+        return retl
 
 
 class HBNBCommand(cmd.Cmd):
@@ -42,15 +43,6 @@ class HBNBCommand(cmd.Cmd):
     """
 
     prompt = "(hbnb) "
-    __classes = {
-        "BaseModel",
-        "User",
-        "State",
-        "City",
-        "Place",
-        "Amenity",
-        "Review"
-        }
 
     def exit(self, arg):
         """
@@ -81,16 +73,28 @@ class HBNBCommand(cmd.Cmd):
             "show": self.doShow,
             "destroy": self.doDestroy,
             "count": self.doCount,
-            "update": self.doUpdate
+            "update": self.doUpdate,
+            "where": self.doWhere,
+            "near": self.doNear,
+            "search": self.doSearch,
+            "sum": self.doSum,
+            "avg": self.doAvg,
+            "min": self.doMin,
+            "max": self.doMax,
+            "group_by": self.doGroupBy
         }
         match = re.search(r"\.", arg)
         if match is not None:
             arg_list = [arg[:match.span()[0]], arg[match.span()[1]:]]
-            match = re.search(r"\((.*?)\)", arg_list[1])
+            match = re.search(r"\(((?:\"[^\"]*\"|'[^']*'|[^\"')])*)\)",
+                              arg_list[1])
             if match is not None:
                 cmd = [arg_list[1][:match.span()[0]], match.group()[1:-1]]
                 if cmd[0] in arg_dict.keys():
                     call = "{} {}".format(arg_list[0], cmd[1])
+                    if cmd[0] == "group_by":
+                        rest = arg_list[1][match.span()[1]:].lstrip(".")
+                        call = "{} {}".format(call, rest)
                     return arg_dict[cmd[0]](call)
         print("*** Unknown format: {}".format(arg))
         return False
@@ -102,10 +106,10 @@ class HBNBCommand(cmd.Cmd):
         arg_list = parser(arg)
         if len(arg_list) == 0:
             print("** class name missing **")
-        elif arg_list[0] not in HBNBCommand.__classes:
+        elif arg_list[0] not in classes:
             print("** class doesn't exist **")
         else:
-            print(eval(arg_list[0])().id)
+            print(classes[arg_list[0]]().id)
             storage.save()
 
     def doShow(self, arg):
@@ -116,7 +120,7 @@ class HBNBCommand(cmd.Cmd):
         obj_dict = storage.all()
         if len(arg_list) == 0:
             print("** class name missing **")
-        elif arg_list[0] not in HBNBCommand.__classes:
+        elif arg_list[0] not in classes:
             print("** class doesn't exist **")
         elif len(arg_list) == 1:
             print("** instance id missing **")
@@ -133,14 +137,14 @@ class HBNBCommand(cmd.Cmd):
         obj_dict = storage.all()
         if len(arg_list) == 0:
             print("** class name missing **")
-        elif arg_list[0] not in HBNBCommand.__classes:
+        elif arg_list[0] not in classes:
             print("** class doesn't exist **")
         elif len(arg_list) == 1:
             print("** instance id missing **")
         elif "{}.{}".format(arg_list[0], arg_list[1]) not in obj_dict.keys():
             print("** no instance found **")
         else:
-            del obj_dict["{}.{}".format(arg_list[0], arg_list[1])]
+            storage.delete(obj_dict["{}.{}".format(arg_list[0], arg_list[1])])
             storage.save()
 
     def doAll(self, arg):
@@ -148,26 +152,175 @@ class HBNBCommand(cmd.Cmd):
         Display string representations of all instances of a given class.
         If no class is specified, displays all instantiated objects."""
         arg_list = parser(arg)
-        if len(arg_list) > 0 and arg_list[0] not in HBNBCommand.__classes:
+        if len(arg_list) > 0 and arg_list[0] not in classes:
             print("** class doesn't exist **")
         else:
             objl = []
-            for obj in storage.all().values():
-                if len(arg_list) > 0 and arg_list[0] == obj.__class__.__name__:
-                    objl.append(obj.__str__())
-                elif len(arg_list) == 0:
-                    objl.append(obj.__str__())
+            if len(arg_list) > 0:
+                objs = storage.all(arg_list[0])
+            else:
+                objs = storage.all()
+            for obj in objs.values():
+                objl.append(obj.__str__())
             print(objl)
 
     def doCount(self, arg):
         """Usage: count <class> or <class>.count()
         Retrieve the number of instances of a given class."""
         arg_list = parser(arg)
-        count = 0
-        for obj in storage.all().values():
-            if arg_list[0] == obj.__class__.__name__:
-                count += 1
-        print(count)
+        print(storage.count(arg_list[0]))
+
+    def doWhere(self, arg):
+        """Usage: <class>.where(<attr> <op> <value>, ...)
+        Display string representations of the instances of a given class
+        meeting every condition, op being one of ==, !=, <, <=, > or >=."""
+        cls_name, _, conditions = arg.partition(" ")
+        if cls_name == "":
+            print("** class name missing **")
+            return False
+        if cls_name not in classes:
+            print("** class doesn't exist **")
+            return False
+        query = storage.query(cls_name)
+        rest = conditions.strip()
+        while rest:
+            match = re.match(r"\s*(\w+)\s*(==|!=|<=|>=|<|>)\s*"
+                             r"(\"[^\"]*\"|'[^']*'|[^,\"']*?)\s*"
+                             r"(?:,(?=\s*\S)|$)", rest)
+            if match is None:
+                print("** invalid condition **")
+                return False
+            rest = rest[match.end():]
+            name, op, value = match.groups()
+            if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            else:
+                for cast in (int, float):
+                    try:
+                        value = cast(value)
+                        break
+                    except ValueError:
+                        pass
+            query = query.where(name, op, value)
+        print([obj.__str__() for obj in query])
+
+    def doNear(self, arg):
+        """Usage: <class>.near(<latitude>, <longitude>, <k>)
+        Display string representations of the k instances of a given class
+        closest to a location, closest first. k defaults to 10."""
+        arg_list = parser(arg)
+        if len(arg_list) == 0:
+            print("** class name missing **")
+            return False
+        if arg_list[0] not in classes:
+            print("** class doesn't exist **")
+            return False
+        try:
+            lat, lon = float(arg_list[1]), float(arg_list[2])
+            k = int(arg_list[3]) if len(arg_list) > 3 else 10
+        except (IndexError, ValueError):
+            print("** invalid location **")
+            return False
+        print([obj.__str__() for obj in storage.near(arg_list[0], lat, lon,
+                                                     k)])
+
+    def doSearch(self, arg):
+        """Usage: <class>.search("<words>")
+        Display string representations of the instances of a given class
+        whose text holds some of the words, best match first."""
+        cls_name, _, text = arg.partition(" ")
+        if cls_name == "":
+            print("** class name missing **")
+            return False
+        if cls_name not in classes:
+            print("** class doesn't exist **")
+            return False
+        text = text.strip()
+        if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'":
+            text = text[1:-1]
+        print([obj.__str__() for obj in storage.search(cls_name, text)])
+
+    def doSum(self, arg):
+        """Usage: <class>.sum(<attribute_name>)
+        Display the sum of a numeric attribute over a given class."""
+        self.__aggregate("sum", arg)
+
+    def doAvg(self, arg):
+        """Usage: <class>.avg(<attribute_name>)
+        Display the average of a numeric attribute over a given class."""
+        self.__aggregate("avg", arg)
+
+    def doMin(self, arg):
+        """Usage: <class>.min(<attribute_name>)
+        Display the minimum of a numeric attribute over a given class."""
+        self.__aggregate("min", arg)
+
+    def doMax(self, arg):
+        """Usage: <class>.max(<attribute_name>)
+        Display the maximum of a numeric attribute over a given class."""
+        self.__aggregate("max", arg)
+
+    def doGroupBy(self, arg):
+        """Usage: <class>.group_by(<attribute_name>).count() or
+       <class>.group_by(<attribute_name>).<sum|avg|min|max>(<attribute>)
+        Display a table of the number of instances of a given class, or of
+        an aggregate of a numeric attribute, for every value of another."""
+        cls_name, _, rest = arg.strip().partition(" ")
+        if cls_name == "":
+            print("** class name missing **")
+            return False
+        if cls_name not in classes:
+            print("** class doesn't exist **")
+            return False
+        group_by, _, rest = rest.strip().partition(" ")
+        group_by = group_by.strip("\"'")
+        if group_by == "":
+            print("** attribute name missing **")
+            return False
+        match = re.fullmatch(r"(count|sum|avg|min|max)"
+                             r"\(\s*[\"']?(\w*)[\"']?\s*\)", rest.strip())
+        if match is None:
+            print("** invalid aggregate **")
+            return False
+        func, name = match.groups()
+        if func == "count":
+            results = storage.count(cls_name, group_by=group_by)
+        elif name == "":
+            print("** attribute name missing **")
+            return False
+        else:
+            results = storage.aggregate(cls_name, func, name,
+                                        group_by=group_by)
+        header = "{}({})".format(func, name)
+        rows = [(HBNBCommand.__cell(value), HBNBCommand.__cell(result))
+                for value, result in sorted(results.items(),
+                                            key=lambda item: str(item[0]))]
+        width = max([len(group_by)] + [len(row[0]) for row in rows])
+        print("{:<{}}  {}".format(group_by, width, header))
+        for value, result in rows:
+            print("{:<{}}  {}".format(value, width, result))
+
+    def __aggregate(self, func, arg):
+        """Display the aggregate func of the attribute named in arg."""
+        arg_list = parser(arg)
+        if len(arg_list) == 0:
+            print("** class name missing **")
+        elif arg_list[0] not in classes:
+            print("** class doesn't exist **")
+        elif len(arg_list) == 1:
+            print("** attribute name missing **")
+        else:
+            print(HBNBCommand.__cell(storage.aggregate(arg_list[0], func,
+                                                       arg_list[1])))
+
+    @staticmethod
+    def __cell(value):
+        """Return the text of a value in aggregate output."""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        if value == "":
+            return '""'
+        return str(value)
 
     def doUpdate(self, arg):
         """Usage: update <class> <id> <attribute_name> <attribute_value> or
@@ -181,7 +334,7 @@ class HBNBCommand(cmd.Cmd):
         if len(arg_list) == 0:
             print("** Class name missing **")
             return False
-        if arg_list[0] not in HBNBCommand.__classes:
+        if arg_list[0] not in classes:
             print("** Class does not exist **")
             return False
         if len(arg_list) == 1:
@@ -200,22 +353,38 @@ class HBNBCommand(cmd.Cmd):
                 print("** Value missing **")
                 return False
 
+        obj = obj_dict["{}.{}".format(arg_list[0], arg_list[1])]
+        cls = classes[arg_list[0]]
+        names = [arg_list[2]] if len(arg_list) == 4 else []
+        if not names and type(eval(arg_list[2])) == dict:
+            names = list(eval(arg_list[2]))
+        if any(isinstance(getattr(type(obj), name, None), property)
+               for name in names):
+            print("** attribute is read-only **")
+            return False
         if len(arg_list) == 4:
-            obj = obj_dict["{}.{}".format(arg_list[0], arg_list[1])]
-            if arg_list[2] in obj.__class__.__dict__.keys():
-                valueType = type(obj.__class__.__dict__[arg_list[2]])
-                obj.__dict__[arg_list[2]] = valueType(arg_list[3])
+            if (arg_list[2] in cls.__dict__.keys() and
+                    type(getattr(cls, arg_list[2])) in {str, int, float,
+                                                        list}):
+                valueType = type(getattr(cls, arg_list[2]))
+                if valueType is list:
+                    try:
+                        value = list(literal_eval(arg_list[3]))
+                    except (ValueError, SyntaxError, TypeError):
+                        value = [arg_list[3]]
+                else:
+                    value = valueType(arg_list[3])
+                setattr(obj, arg_list[2], value)
             else:
-                obj.__dict__[arg_list[2]] = arg_list[3]
+                setattr(obj, arg_list[2], arg_list[3])
         elif type(eval(arg_list[2])) == dict:
-            obj = obj_dict["{}.{}".format(arg_list[0], arg_list[1])]
             for k, v in eval(arg_list[2]).items():
-                if (k in obj.__class__.__dict__.keys() and
-                        type(obj.__class__.__dict__[k]) in {str, int, float}):
-                    valueType = type(obj.__class__.__dict__[k])
-                    obj.__dict__[k] = valueType(v)
+                if (k in cls.__dict__.keys() and
+                        type(getattr(cls, k)) in {str, int, float}):
+                    valueType = type(getattr(cls, k))
+                    setattr(obj, k, valueType(v))
                 else:
-                    obj.__dict__[k] = v
+                    setattr(obj, k, v)
         storage.save()
 
 
@@ -2,9 +2,17 @@
 """
 __init__ constructor method to create a new instance of models directory
 and initialized object's attributes.
+
+The storage engine is a FileStorage unless the environment variable
+HBNB_TYPE_STORAGE is set to "db", which selects the SQLite DBStorage.
 """
-from models.engine.FileStorage import FileStorage
+from os import getenv
 
 
-storage = FileStorage()
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.FileStorage import FileStorage
+    storage = FileStorage()
 storage.reload()
@@ -1,14 +1,187 @@
 #!/usr/bin/python3
 """
-Define the BaseModel class.
+Define the BaseModel class and the registry of model classes.
 """
+import json
 import models
+import threading
+from sys import intern
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
+
+classes = {}
+_caching = threading.Lock()
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def interned(name, value):
+    """Return value with its strings interned if name is id, a foreign key
+    (ending in _id) or a list of them (ending in _ids), so the objects
+    referring to one id share a single string."""
+    if name == "id" or name.endswith("_id"):
+        return intern(value) if type(value) is str else value
+    if name.endswith("_ids") and isinstance(value, list):
+        value[:] = [intern(v) if type(v) is str else v for v in value]
+    return value
+
+
+class DefaultList(list):
+    """Represent the empty list a ListAttribute gives an instance that has
+    none, which becomes the list of the instance when it is first changed.
+
+    Attributes:
+        owner (BaseModel): The instance, until the list is assigned to it.
+        name (str): The name of the attribute.
+    """
+
+    __slots__ = ("owner", "name")
+
+    def __init__(self, owner, name):
+        """Initialize an empty list for the attribute name of owner."""
+        super().__init__()
+        self.owner = owner
+        self.name = name
+
+    def _attach(self):
+        """Assign the list to the attribute of its owner, once."""
+        owner, self.owner = self.owner, None
+        if owner is not None:
+            setattr(owner, self.name, self)
+
+
+def _attaching(method):
+    """Return method of list followed by DefaultList._attach()."""
+    def attaching(self, *args):
+        result = method(self, *args)
+        self._attach()
+        return result
+    attaching.__name__ = method.__name__
+    attaching.__doc__ = method.__doc__
+    return attaching
+
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear",
+              "sort", "reverse", "__setitem__", "__delitem__",
+              "__iadd__", "__imul__"):
+    setattr(DefaultList, _name, _attaching(getattr(list, _name)))
+
+
+class ListAttribute:
+    """Represent a list class attribute that gives every instance its own
+    list, so appending to it never changes the other instances.
+
+    Read on the class, it is a new empty list. Read on an instance that
+    has none, it is a new DefaultList, stored only once it is changed, so
+    reading the attribute never changes the instance.
+    """
+
+    def __set_name__(self, owner, name):
+        """Remember the name the attribute is bound to."""
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        """Return the list of obj, or a new DefaultList if it has none."""
+        if obj is None:
+            return []
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            return DefaultList(obj, self.name)
+
+
+class Timestamp:
+    """Represent a datetime attribute held as an integer number of
+    microseconds since the epoch and turned back into a datetime when it
+    is read.
+
+    Aware datetimes and values that are not datetimes are held as given.
+    """
+
+    def __init__(self, slot=None):
+        """Initialize the attribute, held in the __dict__ of the instance
+        or in the given slot descriptor."""
+        self.slot = slot
+
+    def __set_name__(self, owner, name):
+        """Remember the name the attribute is bound to."""
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        """Return the datetime of obj."""
+        if obj is None:
+            return self
+        if self.slot is not None:
+            value = self.slot.__get__(obj, owner)
+        else:
+            try:
+                value = obj.__dict__[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+        if type(value) is int:
+            return EPOCH + value * MICROSECOND
+        return value
+
+    def __set__(self, obj, value):
+        """Set the datetime of obj."""
+        if type(value) is datetime and value.tzinfo is None:
+            value = (value - EPOCH) // MICROSECOND
+        if self.slot is not None:
+            self.slot.__set__(obj, value)
+        else:
+            obj.__dict__[self.name] = value
 
 
 class BaseModel:
-    """Represents the BaseModel of the HBnB project."""
+    """Represents the BaseModel of the HBnB project.
+
+    The serialized forms are cached only while the instance holds no list,
+    dict or set, since those can change without an assignment.
+
+    Attributes:
+        created_at (Timestamp): The date and time of creation.
+        updated_at (Timestamp): The date and time of the last save.
+        _json (str): Cached JSON text of to_dict(), cleared whenever an
+            attribute is assigned.
+        _dict (dict): Cached result of to_dict(), cleared likewise.
+        _str (str): Cached result of __str__(), cleared likewise.
+        _indexed (tuple): Names of the attributes storage keeps a hash
+            index of.
+        _ranged (tuple): Names of the numeric attributes storage keeps a
+            sorted index of.
+        _located (tuple): Names of the latitude and longitude attributes
+            storage keeps a spatial index of, if any.
+        _searchable (tuple): Names of the text attributes storage keeps a
+            full-text index of.
+        _tagged (tuple): Names of the list attributes storage keeps a
+            bitmap index of.
+        _numeric (tuple): Names of the numeric attributes storage keeps a
+            columnar copy of for aggregates.
+        _ids (tuple): Names of the id attributes of the class, whose
+            strings are interned on reload.
+    """
+
+    __slots__ = ("__dict__", "__weakref__", "_json", "_dict", "_str")
+    _indexed = ()
+    _ranged = ()
+    _located = ()
+    _searchable = ()
+    _tagged = ()
+    _numeric = ()
+    _ids = ("id",)
+    created_at = Timestamp()
+    updated_at = Timestamp()
+
+    def __init_subclass__(cls, register=True, **kwargs):
+        """Register a new model class in classes under its name, so storage
+        and the console find it without being edited, unless register is
+        False."""
+        super().__init_subclass__(**kwargs)
+        cls._ids = ("id",) + tuple(
+            name for name in dir(cls)
+            if not name.startswith("_") and name.endswith(("_id", "_ids")))
+        if register:
+            classes[cls.__name__] = cls
 
     def __init__(self, *args, **kwargs):
         """Initialize a new BaseModel.
@@ -16,39 +189,398 @@ class BaseModel:
             *args (any): To be used.
             **kwargs (dict): Key or value pairs of attributes.
         """
-        timeFormat = "%Y-%m-%dT%H:%M:%S.%f"
-        self.id = str(uuid4())
-        self.created_at = datetime.today()
-        self.updated_at = datetime.today()
         if len(kwargs) != 0:
-            for x, y in kwargs.items():
-                if x == "created_at" or x == "updated_at":
-                    self.__dict__[x] = datetime.strptime(y, timeFormat)
-                else:
-                    self.__dict__[x] = y
+            self.__hydrate(kwargs)
         else:
+            self.id = intern(str(uuid4()))
+            self.created_at = datetime.today()
+            self.updated_at = datetime.today()
             models.storage.new(self)
 
+    @classmethod
+    def from_dict(cls, dictionary):
+        """Return an instance of cls holding the attributes of a to_dict()
+        dictionary, as storage does when it reloads objects.
+
+        Unlike cls(**dictionary), __init__ is skipped and dictionary itself
+        becomes the __dict__ of the instance, so it must not be reused.
+        """
+        obj = cls.__new__(cls)
+        obj._load(dictionary)
+        return obj
+
+    def _load(self, dictionary):
+        """Make the attributes of a to_dict() dictionary those of the
+        instance."""
+        dictionary.pop("__class__", None)
+        self.__hydrate(dictionary)
+
+    @classmethod
+    def compact(cls):
+        """Return the compact variant of cls, made on first use.
+
+        The variant is an unregistered subclass of the same name whose
+        declared attributes (id, created_at, updated_at and the class
+        attributes) are held in slots instead of a __dict__ per instance.
+        """
+        variant = cls.__dict__.get("_compact")
+        if variant is None:
+            names = ["id", "created_at", "updated_at"]
+            for klass in reversed(cls.__mro__):
+                for name, value in vars(klass).items():
+                    if (not name.startswith("_") and name not in names and
+                            isinstance(value, (str, int, float, list,
+                                               ListAttribute))):
+                        names.append(name)
+            variant = type(cls.__name__, (CompactModel, cls), {
+                "__slots__": tuple(names) + ("_order", "_extra"),
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "_base": cls,
+                "_slotted": tuple(names),
+                "_shapes": {},
+                "_lists": frozenset(
+                    name for name in names
+                    if isinstance(cls.__dict__.get(name), ListAttribute)),
+            }, register=False)
+            for name in ("created_at", "updated_at"):
+                timestamp = Timestamp(variant.__dict__[name])
+                timestamp.__set_name__(variant, name)
+                type.__setattr__(variant, name, timestamp)
+            type.__setattr__(cls, "_compact", variant)
+            type.__setattr__(variant, "_compact", variant)
+        return variant
+
+    @classmethod
+    def proxy(cls):
+        """Return the proxy variant of cls, made on first use.
+
+        The variant is an unregistered subclass of the same name and
+        layout, so a proxy can turn into an instance of cls in place.
+        """
+        variant = cls.__dict__.get("_proxy")
+        if variant is None:
+            variant = type(cls.__name__, (ProxyModel, cls), {
+                "__slots__": (),
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "_target": cls,
+            }, register=False)
+            type.__setattr__(cls, "_proxy", variant)
+            type.__setattr__(variant, "_proxy", variant)
+        return variant
+
+    def __hydrate(self, attributes):
+        """Make attributes the __dict__ of the instance, parsing created_at
+        and updated_at into epoch microseconds, interning the ids and
+        generating only the id and dates missing."""
+        for name in ("created_at", "updated_at"):
+            if name in attributes:
+                value = datetime.fromisoformat(attributes[name])
+            else:
+                value = datetime.today()
+            if value.tzinfo is None:
+                value = (value - EPOCH) // MICROSECOND
+            attributes[name] = value
+        if "id" not in attributes:
+            attributes["id"] = str(uuid4())
+        for name in self._ids:
+            if name in attributes:
+                attributes[name] = interned(name, attributes[name])
+        object.__setattr__(self, "__dict__", attributes)
+        self._forget()
+
     def save(self):
         """Update the current date and time."""
         self.updated_at = datetime.today()
+        models.storage.touch(self)
         models.storage.save()
 
+    def __setattr__(self, name, value):
+        """Set an attribute, interning it if it holds ids, and mark the
+        instance as changed."""
+        object.__setattr__(self, name, interned(name, value))
+        self._forget()
+        models.storage.touch(self, name)
+
+    def _attributes(self):
+        """Return a dictionary of the attributes set on the instance."""
+        attributes = self.__dict__.copy()
+        for name in ("created_at", "updated_at"):
+            if name in attributes:
+                attributes[name] = getattr(self, name)
+        return attributes
+
+    def _stored(self, name, default=None):
+        """Return the attribute name set on the instance, or default if it
+        only has the class attribute."""
+        return self.__dict__.get(name, default)
+
+    def _forget(self):
+        """Clear the cached serialized forms of the instance."""
+        with _caching:
+            object.__setattr__(self, "_json", None)
+            object.__setattr__(self, "_dict", None)
+            object.__setattr__(self, "_str", None)
+
+    def _cacheable(self, attributes=None):
+        """Return whether the serialized forms of the instance may be
+        cached, which they may not while it holds a list, dict or set
+        that could change in place without an assignment.
+
+        Args:
+            attributes (dict): A copy of the attributes to check instead
+                of the __dict__ of the instance.
+        """
+        if attributes is None:
+            attributes = self.__dict__
+        return not any(isinstance(value, (list, dict, set))
+                       for value in attributes.values())
+
+    def __cached(self, slot, cls):
+        """Return the cached value of slot if it holds a cls, or a new
+        token claiming the slot for the value about to be built."""
+        value = object.__getattribute__(self, slot)
+        if type(value) is cls:
+            return value
+        token = object()
+        object.__setattr__(self, slot, token)
+        return token
+
+    def __cache(self, slot, token, value, attributes):
+        """Cache value in slot unless an attribute was assigned since the
+        slot was claimed by token, or attributes hold a container."""
+        with _caching:
+            if object.__getattribute__(self, slot) is token:
+                if not self._cacheable(attributes):
+                    value = None
+                object.__setattr__(self, slot, value)
+
+    def to_json(self):
+        """Return the JSON text of to_dict(), reusing it until changed."""
+        text = self.__cached("_json", str)
+        if type(text) is not str:
+            dictionary = self.__serialized()
+            token, text = text, json.dumps(dictionary, separators=(",", ":"))
+            self.__cache("_json", token, text, dictionary)
+        return text
+
     def to_dict(self):
         """
         Dictionary of the BaseModel.
 
-        Include the key and value pair of the __class__ name.
+        Include the key and value pair of the __class__ name. The result
+        is a copy of one cached until an attribute is assigned.
         """
-        returnDictionary = self.__dict__.copy()
-        returnDictionary["created_at"] = self.created_at.isoformat()
-        returnDictionary["updated_at"] = self.updated_at.isoformat()
-        returnDictionary["__class__"] = self.__class__.__name__
+        return self.__serialized().copy()
+
+    def __serialized(self):
+        """Return the cached dictionary of to_dict(), building it first if
+        an attribute was assigned since."""
+        returnDictionary = self.__cached("_dict", dict)
+        if type(returnDictionary) is not dict:
+            token, returnDictionary = returnDictionary, self._attributes()
+            returnDictionary["created_at"] = self.created_at.isoformat()
+            returnDictionary["updated_at"] = self.updated_at.isoformat()
+            returnDictionary["__class__"] = self.__class__.__name__
+            self.__cache("_dict", token, returnDictionary, returnDictionary)
         return returnDictionary
 
     def __str__(self):
         """
-        Return the string representation of the BaseModel.
+        Return the string representation of the BaseModel, cached until
+        an attribute is assigned.
         """
-        className = self.__class__.__name__
-        return "[{}] ({}) {}".format(className, self.id, self.__dict__)
+        text = self.__cached("_str", str)
+        if type(text) is not str:
+            attributes = self._attributes()
+            className = self.__class__.__name__
+            token, text = text, "[{}] ({}) {}".format(className, self.id,
+                                                      attributes)
+            self.__cache("_str", token, text, attributes)
+        return text
+
+
+class CompactModel:
+    """Mixin of the compact variants made by BaseModel.compact().
+
+    The declared attributes live in slots, read as the class attribute
+    while unset; any other attribute goes to the _extra dictionary, made
+    only when one is set. The names set, in the order they were set, are
+    kept as a tuple shared by all the instances of the same shape, so
+    to_dict() and __str__() list them as BaseModel does. Neither they nor
+    to_json() are cached, so an instance holds nothing but its values.
+
+    Attributes:
+        _base (type): The registered class the variant is made from.
+        _slotted (tuple): Names of the attributes held in slots.
+        _lists (frozenset): Names of the ListAttribute attributes.
+        _shapes (dict): The shared tuple of every order of names seen.
+        _order (tuple): Names of the attributes set, in order.
+        _extra (dict): The attributes set outside the slots, or None.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        """Initialize a new instance as BaseModel does."""
+        object.__setattr__(self, "_order", ())
+        object.__setattr__(self, "_extra", None)
+        if len(kwargs) != 0:
+            self.__load(kwargs)
+        else:
+            super().__init__()
+
+    def _load(self, dictionary):
+        """Make the attributes of a to_dict() dictionary those of the
+        instance."""
+        object.__setattr__(self, "_order", ())
+        object.__setattr__(self, "_extra", None)
+        dictionary.pop("__class__", None)
+        self.__load(dictionary)
+
+    def __load(self, attributes):
+        """Set attributes on the instance, parsing created_at and
+        updated_at and generating only the id and dates missing."""
+        for name in ("created_at", "updated_at"):
+            if name in attributes:
+                attributes[name] = datetime.fromisoformat(attributes[name])
+            else:
+                attributes[name] = datetime.today()
+        if "id" not in attributes:
+            attributes["id"] = str(uuid4())
+        order = tuple(attributes)
+        object.__setattr__(self, "_order",
+                           self._shapes.setdefault(order, order))
+        for name, value in attributes.items():
+            self.__assign(name, value)
+        self._forget()
+
+    def __assign(self, name, value):
+        """Set name to value in its slot, or in _extra if it has none, and
+        add name to the order of the instance if it is new."""
+        value = interned(name, value)
+        if name in self._slotted or isinstance(
+                getattr(type(self), name, None), property):
+            object.__setattr__(self, name, value)
+        elif self._extra is None:
+            object.__setattr__(self, "_extra", {name: value})
+        else:
+            self._extra[name] = value
+        if name not in self._order:
+            order = self._order + (name,)
+            object.__setattr__(self, "_order",
+                               self._shapes.setdefault(order, order))
+
+    def __setattr__(self, name, value):
+        """Set an attribute and mark the instance as changed."""
+        self.__assign(name, value)
+        self._forget()
+        models.storage.touch(self, name)
+
+    def __getattr__(self, name):
+        """Return the attribute name missing from the slots: an ad-hoc
+        attribute, a new DefaultList of a ListAttribute or the class
+        attribute."""
+        if name.startswith("__") or name in ("_order", "_extra"):
+            raise AttributeError(name)
+        extra = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+        if name in self._lists:
+            return DefaultList(self, name)
+        if name in self._slotted:
+            return getattr(self._base, name)
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def _attributes(self):
+        """Return a dictionary of the attributes set on the instance."""
+        extra = self._extra
+        attributes = {}
+        for name in self._order:
+            if extra is not None and name in extra:
+                attributes[name] = extra[name]
+            else:
+                attributes[name] = object.__getattribute__(self, name)
+        return attributes
+
+    def _stored(self, name, default=None):
+        """Return the attribute name set on the instance, or default if it
+        only has the class attribute."""
+        if name not in self._order:
+            return default
+        extra = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+        return object.__getattribute__(self, name)
+
+    def to_json(self):
+        """Return the JSON text of to_dict()."""
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def to_dict(self):
+        """Return the dictionary of the instance, as BaseModel does."""
+        dictionary = self._attributes()
+        dictionary["created_at"] = self.created_at.isoformat()
+        dictionary["updated_at"] = self.updated_at.isoformat()
+        dictionary["__class__"] = type(self).__name__
+        return dictionary
+
+    def __str__(self):
+        """Return the string representation of the instance, as BaseModel
+        does."""
+        return "[{}] ({}) {}".format(type(self).__name__, self.id,
+                                     self._attributes())
+
+
+class ProxyModel:
+    """Mixin of the proxy variants made by BaseModel.proxy().
+
+    A proxy holds nothing but the JSON text of an object, as its cached
+    to_json(), so storage can hand it out without decoding the text.
+    Reading or setting any other attribute turns it into an instance of
+    the class it stands for first; until then to_json() returns the text
+    as it was read.
+
+    Attributes:
+        _target (type): The class the proxy turns into.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, text):
+        """Return a proxy of the object described by the JSON text."""
+        obj = cls.__new__(cls)
+        object.__setattr__(obj, "_json", text)
+        return obj
+
+    def __getattribute__(self, name):
+        """Return the attribute name, turning the proxy into the object it
+        stands for unless name is to_json."""
+        if name not in ("to_json", "_json", "__class__"):
+            ProxyModel._hydrate(self)
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        """Set an attribute of the object the proxy stands for."""
+        ProxyModel._hydrate(self)
+        setattr(self, name, value)
+
+    def _hydrate(self):
+        """Turn the proxy into an instance of _target holding the
+        attributes of its JSON text, which stays cached as to_json()."""
+        text = object.__getattribute__(self, "_json")
+        target = type(self)._target
+        object.__setattr__(self, "__class__", target)
+        self._load(json.loads(text))
+        if not issubclass(target, CompactModel) and self._cacheable():
+            object.__setattr__(self, "_json", text)
+
+    def to_json(self):
+        """Return the JSON text the proxy was made from."""
+        return object.__getattribute__(self, "_json")
+
+
+classes[BaseModel.__name__] = BaseModel
@@ -2,7 +2,9 @@
 """
 Defines the City class.
 """
+import models
 from models.base_model import BaseModel
+from models.place import Place
 
 
 class City(BaseModel):
@@ -12,7 +14,21 @@ class City(BaseModel):
     Attributes:
         state_id (str):  State id.
         name (str):  Name of the city.
+        places (list):  The places in the city, read-only.
     """
 
     state_id = ""
     name = ""
+
+    _indexed = ("state_id",)
+
+    @property
+    def places(self):
+        """list: The places in the city.
+
+        Read from the bucket of the city's id in the hash index of
+        Place.city_id, which storage keeps current when a city_id is
+        assigned; that bucket stands in for a per-city cache. Under
+        DBStorage this is one indexed query.
+        """
+        return list(models.storage.lookup(Place, "city_id", self.id).values())
@@ -2,14 +2,30 @@
 """
 Define the FileStorage class.
 """
+import os
 import json
-from models.base_model import BaseModel
-import models.city
-import models.amenity
-import models.place
-import models.review
-import models.state
-import models.user
+import marshal
+import mmap
+import time
+import atexit
+import tempfile
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from models.engine.lazy_objects import LazyObjects
+from models.engine.query import Query
+from models.engine.json_stream import iter_entries
+from models.engine.columns import Columns, aggregate
+from models.engine.indexes import AttributeIndex, GeoIndex, SortedIndex
+from models.engine.indexes import BitmapIndex, TextIndex, listed
+from models.base_model import classes
+# The model modules register their classes in classes when imported.
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
 
 
 class FileStorage:
@@ -18,34 +34,1089 @@ class FileStorage:
     Attributes:
         __file_path (str): The name of the file to save objects to.
         __objects (dict): A dictionary of instantiated objects.
+        __journal (bool): Append changed objects to a log next to
+            __file_path instead of rewriting it on every save.
+        __journal_limit (int): Minimum number of log records before the
+            log is folded back into __file_path.
+        __pending (set): Keys of the objects created, changed or deleted
+            since the last save.
+        __lock (threading.RLock): Guards __objects, __pending and the
+            indexes, which the background flusher shares with the
+            threads changing objects.
+        __log_size (int): Number of records currently in the log.
+        __commit_window (float): Seconds a save waits for concurrent saves
+            to join its disk write.
+        __commit (threading.Condition): Guards the group commit counters.
+        __requested (int): Number of saves requested so far.
+        __committed (int): Number of requested saves already on disk.
+        __committing (bool): Whether a save is currently writing.
+        __flush_interval (float): Seconds between background flushes in
+            write-behind mode, which is off while this is 0.
+        __flush_changes (int): Number of deferred saves that triggers a
+            background flush before __flush_interval elapses.
+        __unflushed (int): Number of saves deferred since the last flush.
+        __flusher (threading.Thread): The background flusher, if started.
+        __error (Exception): The error the last background flush raised,
+            re-raised by the next save().
+        __wakeup (threading.Event): Wakes the flusher ahead of time.
+        __partitioned (bool): Keep one file per class next to __file_path
+            instead of a single file.
+        __stale (set): Names of the classes whose partition is out of date.
+        __skipped (set): Names of the classes whose partition reload() left
+            out, merged from disk before compact() rewrites them.
+        __skipped_of (dict): The __objects that __skipped belongs to.
+        __lazy (bool): Only index the entries of the snapshot on reload
+            and hold a proxy of each object once it is looked up, built
+            the first time one of its attributes is used.
+        __compact (bool): Build reloaded objects as the compact variant
+            of their class, which holds its declared attributes in slots.
+        __index (dict): Byte range in a memory-mapped snapshot of every
+            entry not built yet, by key.
+        __indexed (LazyObjects): The __objects that __index belongs to.
+        __by_class (dict): Keys of the stored objects, built or not, by
+            class name.
+        __by_class_of (dict): The __objects that __by_class belongs to.
+        __attr_indexes (dict): The AttributeIndex of every attribute named
+            in the _indexed tuple of a class, by class name then attribute
+            name, built on first use.
+        __range_indexes (dict): The SortedIndex of every attribute named
+            in the _ranged tuple of a class, by class name then attribute
+            name, built on first use.
+        __bitmap_indexes (dict): The BitmapIndex of every list attribute
+            named in the _tagged tuple of a class, by class name then
+            attribute name, built on first use.
+        __columns (dict): The Columns of the _numeric attributes of every
+            class, by class name, built on first use.
+        __geo_indexes (dict): The GeoIndex of every class with a _located
+            pair of attributes, by class name, built on first use.
+        __text_indexes (dict): The TextIndex of every class with
+            _searchable attributes, by class name, loaded from the file
+            next to __file_path or built on first use.
+        __unindexed (set): Keys of objects of searchable classes that
+            changed while their TextIndex was not loaded.
+        __text_dirty (set): Names of the classes whose TextIndex in
+            memory differs from the one in the file next to __file_path.
     """
     __file_path = "file.json"
     __objects = {}
+    __journal = os.getenv("HBNB_JOURNAL", "0") == "1"
+    __journal_limit = 1000
+    __pending = set()
+    __lock = threading.RLock()
+    __log_size = 0
+    __commit_window = float(os.getenv("HBNB_COMMIT_WINDOW_MS", "0")) / 1000
+    __commit = threading.Condition()
+    __requested = 0
+    __committed = 0
+    __committing = False
+    __flush_interval = float(os.getenv("HBNB_FLUSH_INTERVAL_MS", "0")) / 1000
+    __flush_changes = int(os.getenv("HBNB_FLUSH_CHANGES", "1000"))
+    __unflushed = 0
+    __flusher = None
+    __error = None
+    __wakeup = threading.Event()
+    __partitioned = os.getenv("HBNB_PARTITIONED", "0") == "1"
+    __stale = set()
+    __skipped = set()
+    __skipped_of = None
+    __lazy = os.getenv("HBNB_LAZY", "0") == "1"
+    __compact = os.getenv("HBNB_COMPACT", "0") == "1"
+    __index = {}
+    __indexed = None
+    __by_class = {}
+    __by_class_of = None
+    __attr_indexes = {}
+    __range_indexes = {}
+    __bitmap_indexes = {}
+    __columns = {}
+    __geo_indexes = {}
+    __text_indexes = {}
+    __unindexed = set()
+    __text_dirty = set()
 
-    def all(self):
-        """Return the dictionary __objects."""
-        return FileStorage.__objects
+    def all(self, cls=None):
+        """Return the dictionary __objects, or a dictionary of the objects
+        of cls only when it is given.
+
+        Args:
+            cls (type or str): A model class or class name.
+        """
+        if cls is None:
+            return FileStorage.__objects
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        odict = FileStorage.__objects
+        objs = {}
+        for key in self.__class_index().get(cls, ()):
+            obj = odict.get(key)
+            if obj is not None:
+                objs[key] = obj
+        return objs
+
+    def count(self, cls=None, group_by=None):
+        """Return the number of stored objects, or of objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+            group_by (str): An attribute to count the objects of cls having
+                every value of separately, returning a dictionary of the
+                counts by value. It is read from the hash index of the
+                attribute if it has one.
+        """
+        if cls is None:
+            return sum(len(keys) for keys in self.__class_index().values())
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if group_by is not None:
+            if cls not in classes:
+                return {}
+            return {value: len(keys) for value, keys in
+                    self.__groups(classes[cls], group_by).items()}
+        return len(self.__class_index().get(cls, ()))
+
+    def lookup(self, cls, name, value):
+        """Return a dictionary of the objects of cls whose attribute name
+        equals value.
+
+        Attributes listed in the _indexed tuple of cls are answered from
+        a hash index in time proportional to the matches; others are
+        found by scanning the objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+            name (str): The attribute name.
+            value (any): The value to match.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return {}
+        index = None
+        if name in cls._indexed:
+            try:
+                hash(value)
+                index = self.__attr_index(cls.__name__, name)
+            except TypeError:
+                pass
+        if index is None:
+            return {key: obj for key, obj in self.all(cls).items()
+                    if getattr(obj, name, None) == value}
+        return dict(index.lookup(value))
 
     def new(self, obj):
         """Set in __objects obj with key <obj_class_name>.id"""
         ocname = obj.__class__.__name__
-        FileStorage.__objects["{}.{}".format(ocname, obj.id)] = obj
+        key = "{}.{}".format(ocname, obj.id)
+        with FileStorage.__lock:
+            FileStorage.__objects[key] = obj
+            FileStorage.__pending.add(key)
+            FileStorage.__index.pop(key, None)
+            self.__class_index().setdefault(ocname, set()).add(key)
+            for index in self.__indexes(key):
+                index.add(key, obj)
+
+    def delete(self, obj=None):
+        """Delete obj from __objects if it is stored there, or from the
+        partition of its class if reload() left that out."""
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        with FileStorage.__lock:
+            removed = FileStorage.__objects.pop(key, None)
+            if (removed is not None or
+                    FileStorage.__index.pop(key, None) is not None):
+                FileStorage.__pending.add(key)
+                keys = self.__class_index().get(obj.__class__.__name__)
+                if keys is not None:
+                    keys.discard(key)
+                for index in self.__indexes(key):
+                    index.discard(key)
+            elif obj.__class__.__name__ in self.__skipped_classes():
+                FileStorage.__pending.add(key)
+
+    def between(self, cls, name, low=None, high=None, *, include_low=True,
+                include_high=True, reverse=False):
+        """Yield in order the objects of cls whose numeric attribute name
+        lies between low and high.
+
+        Attributes listed in the _ranged tuple of cls are answered from a
+        sorted index in time proportional to the objects taken from the
+        generator; others are found by sorting the objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+            name (str): The attribute name.
+            low (int or float): The lower bound, or None for no bound.
+            high (int or float): The upper bound, or None for no bound.
+            include_low (bool): Whether a value equal to low is included.
+            include_high (bool): Whether a value equal to high is included.
+            reverse (bool): Whether to yield the largest values first.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return
+        if name in cls._ranged:
+            index = self.__range_index(cls.__name__, name)
+        else:
+            index = SortedIndex(name)
+            for key, obj in self.all(cls).items():
+                index.add(key, obj)
+        odict = FileStorage.__objects
+        for key in index.between(low, high, include_low, include_high,
+                                 reverse):
+            obj = odict.get(key)
+            if obj is not None:
+                yield obj
+
+    def having(self, cls, name, values):
+        """Return a dictionary of the objects of cls whose list attribute
+        name holds every element of values.
+
+        Attributes listed in the _tagged tuple of cls are answered from a
+        bitmap index by ANDing the bitmaps of the elements; others are
+        found by scanning the objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+            name (str): The list attribute name.
+            values (iterable): The elements to match.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return {}
+        values = list(values)
+        if name in cls._tagged:
+            return self.__bitmap_index(cls.__name__, name).having(values)
+        return {key: obj for key, obj in self.all(cls).items()
+                if all(value in listed(obj, name) for value in values)}
+
+    def places_having(self, amenity_ids):
+        """Return a dictionary of the places having every amenity of
+        amenity_ids."""
+        return self.having(Place, "amenity_ids", amenity_ids)
+
+    def aggregate(self, cls, func, name, *args, group_by=None):
+        """Return the aggregate func of the numeric attribute name over the
+        objects of cls, leaving out those where it is not a number.
+
+        Attributes listed in the _numeric tuple of cls are read from a
+        columnar copy kept in sync with the objects; others are copied
+        from the objects of cls first.
+
+        Args:
+            cls (type or str): A model class or class name.
+            func (str): One of count, sum, avg, min, max, percentile or
+                histogram.
+            name (str): The numeric attribute name.
+            *args: The percentage of percentile or the number of bins of
+                histogram.
+            group_by (str): An attribute to aggregate every value of
+                separately, returning a dictionary of the results by value.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return {} if group_by else aggregate(func, array("d"), *args)
+        if name in cls._numeric:
+            columns = self.__column_store(cls.__name__)
+        else:
+            columns = Columns((name,))
+            for key, obj in self.all(cls).items():
+                columns.add(key, obj)
+        if group_by is None:
+            return columns.aggregate(func, name, *args)
+        return {value: columns.aggregate(func, name, *args, keys=keys)
+                for value, keys in self.__groups(cls, group_by).items()}
+
+    def within(self, cls, south, west, north, east):
+        """Return the list of objects of cls located inside a bounding box.
+
+        The box crosses the antimeridian when west is greater than east.
+
+        Args:
+            cls (type or str): A model class or class name with a _located
+                pair of attributes.
+            south (float): The southern latitude.
+            west (float): The western longitude.
+            north (float): The northern latitude.
+            east (float): The eastern longitude.
+        """
+        index = self.__geo_index(cls)
+        if index is None:
+            return []
+        odict = FileStorage.__objects
+        return [odict[key] for key in index.within(south, west, north, east)]
+
+    def near(self, cls, lat, lon, k=10):
+        """Return the list of the k objects of cls closest to a location,
+        closest first.
+
+        Args:
+            cls (type or str): A model class or class name with a _located
+                pair of attributes.
+            lat (float): The latitude of the location.
+            lon (float): The longitude of the location.
+            k (int): The number of objects to return.
+        """
+        index = self.__geo_index(cls)
+        if index is None:
+            return []
+        odict = FileStorage.__objects
+        return [odict[key] for _, key in index.nearest(lat, lon, k)]
+
+    def places_near(self, lat, lon, k=10):
+        """Return the list of the k places closest to a location."""
+        return self.near(Place, lat, lon, k)
+
+    def search(self, cls, text, k=None):
+        """Return the list of objects of cls whose _searchable attributes
+        hold words of text, best match first.
+
+        Args:
+            cls (type or str): A model class or class name.
+            text (str): The words to look for.
+            k (int): The number of objects to return, or None for all.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None or not cls._searchable:
+            return []
+        odict = FileStorage.__objects
+        return [odict[key] for _, key in
+                self.__text_index(cls.__name__).search(text, k)]
+
+    def query(self, cls):
+        """Return a Query of the objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        return Query(self, cls)
+
+    def touch(self, obj, name=None):
+        """Mark a stored obj as changed so the next save persists it.
+
+        An object that is not the one stored under its key, such as a copy
+        or one held across reload(), is ignored.
+
+        Args:
+            obj (BaseModel): The changed object.
+            name (str): The attribute that changed, or None if any may have.
+        """
+        ocname = obj.__class__.__name__
+        key = "{}.{}".format(ocname, obj.id)
+        with FileStorage.__lock:
+            if dict.get(FileStorage.__objects, key) is not obj:
+                return
+            FileStorage.__pending.add(key)
+            for index in self.__indexes(key, name):
+                index.add(key, obj)
 
     def save(self):
-        """Serialize __objects to the JSON file __file_path."""
+        """Serialize __objects to the JSON file __file_path.
+
+        In write-behind mode the write is left to the background flusher,
+        which runs every __flush_interval or after __flush_changes saves.
+        If a background flush failed since the last save, its error is
+        raised here once the changes are queued for the next flush.
+        """
+        if FileStorage.__flush_interval <= 0:
+            self.flush()
+            return
+        if FileStorage.__flusher is None:
+            FileStorage.__flusher = threading.Thread(
+                target=self.__flush_loop, name="FileStorage-flusher",
+                daemon=True)
+            FileStorage.__flusher.start()
+            atexit.register(self.flush)
+        FileStorage.__unflushed += 1
+        if FileStorage.__unflushed >= FileStorage.__flush_changes:
+            FileStorage.__wakeup.set()
+        error, FileStorage.__error = FileStorage.__error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """Write every change made so far to disk before returning.
+
+        Flushes that arrive while another flush is writing, or within
+        __commit_window of it, are committed together by a single write.
+        """
+        FileStorage.__unflushed = 0
+        commit = FileStorage.__commit
+        with commit:
+            FileStorage.__requested += 1
+            ticket = FileStorage.__requested
+            while FileStorage.__committed < ticket:
+                if FileStorage.__committing:
+                    commit.wait()
+                    continue
+                FileStorage.__committing = True
+                commit.release()
+                try:
+                    if FileStorage.__commit_window > 0:
+                        time.sleep(FileStorage.__commit_window)
+                    target = FileStorage.__requested
+                    self.__write()
+                finally:
+                    commit.acquire()
+                    FileStorage.__committing = False
+                    commit.notify_all()
+                FileStorage.__committed = target
+        FileStorage.__error = None
+
+    def compact(self):
+        """Rewrite __file_path from __objects and discard the log.
+
+        Objects that did not change since they were last serialized
+        contribute their cached JSON text instead of a fresh to_dict().
+        In partitioned mode only the partitions of the classes changed
+        since the last compaction are rewritten, concurrently. If a
+        searchable object changed, the text indexes are then written next
+        to the snapshot, so the next process can load them instead of
+        indexing every object again; otherwise only their stamps are
+        carried over to the new snapshot.
+        """
+        with FileStorage.__lock:
+            pending, FileStorage.__pending = FileStorage.__pending, set()
+            by_class = self.__class_index()
+            rewrite = bool(FileStorage.__text_dirty) or any(
+                self.__searchable(key) for key in FileStorage.__unindexed)
+            if rewrite:
+                self.__load_text_indexes()
+            else:
+                valid = self.__text_stamps()
+            if not FileStorage.__partitioned:
+                keys = [key for keys in by_class.values() for key in keys]
+            else:
+                stale = FileStorage.__stale
+                stale.update(key.partition(".")[0] for key in pending)
+                FileStorage.__stale = set()
+                deleted = {key for key in pending if not
+                           dict.__contains__(FileStorage.__objects, key)}
+                skipped = self.__skipped_classes()
+                for cls_name in stale & skipped:
+                    self.__merge_partition(cls_name, deleted)
+                    skipped.discard(cls_name)
+                parts = {cls_name: list(by_class.get(cls_name, ()))
+                         for cls_name in stale}
+        if not FileStorage.__partitioned:
+            self.__write_snapshot(FileStorage.__file_path, keys)
+        else:
+            try:
+                with ThreadPoolExecutor(max(len(parts), 1)) as pool:
+                    list(pool.map(
+                        lambda c: self.__write_snapshot(
+                            self.__partition_path(c), parts[c]), parts))
+            except BaseException:
+                with FileStorage.__lock:
+                    FileStorage.__stale.update(stale)
+                raise
+        if rewrite:
+            self.__write_text_indexes()
+        else:
+            self.__write_text_stamps(valid)
+        try:
+            os.remove(self.__log_path())
+        except FileNotFoundError:
+            pass
+        FileStorage.__log_size = 0
+
+    def __write_snapshot(self, path, keys):
+        """Atomically replace path with the JSON object of the objects
+        stored under keys, one entry per line.
+
+        Entries are streamed through a buffered writer one at a time, so
+        at most one serialized object is held beyond the cached ones.
+        Entries that were never built are copied from the old snapshot.
+        """
         odict = FileStorage.__objects
-        obj_dict = {obj: odict[obj].to_dict() for obj in odict.keys()}
-        with open(FileStorage.__file_path, "w") as f:
-            json.dump(obj_dict, f)
+        index = self.__raw_index()
 
-    def reload(self):
-        """Deserialize the JSON file __file_path to __objects, if it exists."""
+        def write(f):
+            f.write("{")
+            sep = "\n"
+            for key in keys:
+                obj = dict.get(odict, key)
+                if obj is None:
+                    # fetch() moves an entry to odict under the lock.
+                    with FileStorage.__lock:
+                        obj = dict.get(odict, key)
+                        entry = index.get(key)
+                if obj is not None:
+                    text = obj.to_json()
+                elif entry is not None:
+                    mm, start, end = entry
+                    text = mm[start:end].decode()
+                else:
+                    continue
+                f.write(sep)
+                f.write(json.dumps(key))
+                f.write(":")
+                f.write(text)
+                sep = ",\n"
+            f.write("\n}\n")
+        self.__replace(path, write)
+
+    def __write_text_indexes(self):
+        """Write the built TextIndex of every class next to __file_path,
+        then stamp each with the snapshot file of its class.
+
+        The indexes are written with marshal rather than JSON: they are a
+        cache of this Python version, and marshal reads their nested
+        dictionaries several times faster.
+        """
+        with FileStorage.__lock:
+            names = list(FileStorage.__text_indexes)
+            data = marshal.dumps({
+                cls_name: index.state()
+                for cls_name, index in FileStorage.__text_indexes.items()})
+            FileStorage.__text_dirty = set()
+            FileStorage.__unindexed = set()
+        path = self.__text_path()
+        self.__write_text_stamps(())
+        if not names:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        else:
+            self.__replace(path, lambda f: f.write(data), "wb")
+            self.__write_text_stamps(names)
+
+    def __text_stamps(self):
+        """Return the names of the classes whose text index in the file
+        next to __file_path matches their snapshot file."""
+        try:
+            with open(self.__text_path() + ".stamp") as f:
+                stamps = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if not isinstance(stamps, dict):
+            return set()
+        return {cls_name for cls_name, stamp in stamps.items()
+                if stamp == self.__stamp(cls_name)}
+
+    def __write_text_stamps(self, names):
+        """Stamp the text indexes of the classes in names with their
+        snapshot files, and mark the others as stale."""
+        path = self.__text_path() + ".stamp"
+        stamps = {cls_name: self.__stamp(cls_name) for cls_name in names}
+        if not stamps:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        self.__replace(path, lambda f: json.dump(stamps, f))
+
+    def __replace(self, path, write, mode="w"):
+        """Atomically replace path with the text write(f) writes to f.
+
+        The text goes to a temporary file that is fsynced and renamed
+        into place, so a crash never leaves a truncated path behind.
+        """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                   prefix="." + os.path.basename(path))
+        try:
+            with os.fdopen(fd, mode, buffering=1 << 16) as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.__sync_dir(path)
+
+    def __flush_loop(self):
+        """Flush deferred saves in the background until the process ends."""
+        while True:
+            FileStorage.__wakeup.wait(FileStorage.__flush_interval or None)
+            FileStorage.__wakeup.clear()
+            if FileStorage.__unflushed == 0:
+                continue
+            try:
+                self.flush()
+            except Exception as error:
+                FileStorage.__error = error
+                FileStorage.__unflushed += 1
+
+    def __write(self):
+        """Persist the pending changes, to the log in journal mode."""
+        if not FileStorage.__journal:
+            self.compact()
+            return
+        odict = FileStorage.__objects
+        with FileStorage.__lock:
+            pending, FileStorage.__pending = FileStorage.__pending, set()
+        try:
+            with open(self.__log_path(), "a") as f:
+                for key in pending:
+                    with FileStorage.__lock:
+                        obj = dict.get(odict, key)
+                    if obj is not None:
+                        f.write('{{"op":"put","key":{},"value":{}}}\n'
+                                .format(json.dumps(key), obj.to_json()))
+                    else:
+                        f.write('{{"op":"del","key":{}}}\n'
+                                .format(json.dumps(key)))
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            with FileStorage.__lock:
+                FileStorage.__pending.update(pending)
+            raise
+        if FileStorage.__partitioned:
+            with FileStorage.__lock:
+                FileStorage.__stale.update(key.partition(".")[0]
+                                           for key in pending)
+        FileStorage.__log_size += len(pending)
+        limit = max(FileStorage.__journal_limit, self.count())
+        if FileStorage.__log_size > limit:
+            self.compact()
+
+    def reload(self, *, classes=None):
+        """Deserialize the JSON file __file_path to __objects, if it exists.
+
+        Entries are decoded and built one at a time, so the decoded file
+        never sits in memory next to the objects built from it.
+        Records found in the log are then replayed on top of the snapshot.
+        In partitioned mode, classes may name the only classes to load;
+        it is ignored while the log holds records, since compacting the
+        log needs every partition it touches. In lazy mode the snapshot
+        is only indexed, and __objects holds a proxy of each object once
+        it is looked up, which is decoded when its attributes are first
+        used and saved back verbatim until then.
+        """
+        with FileStorage.__lock:
+            if FileStorage.__lazy:
+                if FileStorage.__indexed is not FileStorage.__objects:
+                    FileStorage.__index = {}
+                    lazy = LazyObjects(self)
+                    lazy.update(FileStorage.__objects)
+                    FileStorage.__objects = FileStorage.__indexed = lazy
+            if os.path.exists(self.__log_path()):
+                classes = None
+            if not FileStorage.__partitioned:
+                paths = [FileStorage.__file_path]
+            else:
+                found = set(self.__partitions())
+                skipped = self.__skipped_classes()
+                if classes is not None:
+                    skipped |= found.difference(classes)
+                    found = found.intersection(classes)
+                FileStorage.__skipped = skipped - found
+                FileStorage.__skipped_of = FileStorage.__objects
+                paths = [self.__partition_path(c) for c in found]
+            for path in paths:
+                try:
+                    if FileStorage.__lazy and self.__index_file(path):
+                        continue
+                    with open(path) as f:
+                        for key, o in iter_entries(f):
+                            FileStorage.__objects[key] = self.__build(o)
+                except FileNotFoundError:
+                    continue
+            FileStorage.__by_class_of = None
+            FileStorage.__log_size = 0
+            try:
+                with open(self.__log_path(), "rb+") as f:
+                    end = 0
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # A torn write from a crash; drop it so later
+                            # appends start on a fresh line.
+                            f.truncate(end)
+                            break
+                        if self.__searchable(record["key"]):
+                            FileStorage.__unindexed.add(record["key"])
+                        if record["op"] == "put":
+                            obj = self.__build(record["value"])
+                            FileStorage.__objects[record["key"]] = obj
+                        else:
+                            FileStorage.__objects.pop(record["key"], None)
+                        FileStorage.__index.pop(record["key"], None)
+                        FileStorage.__log_size += 1
+                        end += len(line)
+            except FileNotFoundError:
+                pass
+
+    def fetch(self, key):
+        """Return a proxy of the object indexed under key that was not
+        built yet, moving it from its index entry to __objects, or None."""
+        with FileStorage.__lock:
+            entry = self.__raw_index().pop(key, None)
+            if entry is None:
+                return None
+            mm, start, end = entry
+            obj = self.__proxy(key, mm[start:end])
+            dict.__setitem__(FileStorage.__objects, key, obj)
+        return obj
+
+    def fetch_all(self):
+        """Yield (key, proxy) for every indexed object not built yet,
+        moving each from its index entry to __objects."""
+        index = self.__raw_index()
+        while index:
+            with FileStorage.__lock:
+                try:
+                    key, (mm, start, end) = index.popitem()
+                except KeyError:
+                    return
+                obj = self.__proxy(key, mm[start:end])
+                dict.__setitem__(FileStorage.__objects, key, obj)
+            yield key, obj
+
+    def __class_index(self):
+        """Return __by_class, rebuilt if __objects was replaced since."""
+        with FileStorage.__lock:
+            odict = FileStorage.__objects
+            if FileStorage.__by_class_of is not odict:
+                by_class = {}
+                keys = list(dict.keys(odict))
+                keys.extend(self.__raw_index())
+                for key in keys:
+                    by_class.setdefault(key.partition(".")[0], set()).add(key)
+                FileStorage.__by_class = by_class
+                FileStorage.__by_class_of = odict
+                FileStorage.__attr_indexes = {}
+                FileStorage.__range_indexes = {}
+                FileStorage.__bitmap_indexes = {}
+                FileStorage.__columns = {}
+                FileStorage.__geo_indexes = {}
+                FileStorage.__text_indexes = {}
+                FileStorage.__text_dirty = set()
+            return FileStorage.__by_class
+
+    def __attr_index(self, cls_name, name):
+        """Return the AttributeIndex of name for cls_name, building it from
+        the stored objects the first time."""
+        with FileStorage.__lock:
+            keys = self.__class_index().get(cls_name, ())
+            indexes = FileStorage.__attr_indexes.setdefault(cls_name, {})
+            index = indexes.get(name)
+            if index is None:
+                index = indexes[name] = AttributeIndex(name)
+                odict = FileStorage.__objects
+                for key in list(keys):
+                    index.add(key, odict[key])
+            return index
+
+    def __range_index(self, cls_name, name):
+        """Return the SortedIndex of name for cls_name, building it from
+        the stored objects the first time."""
+        with FileStorage.__lock:
+            keys = self.__class_index().get(cls_name, ())
+            indexes = FileStorage.__range_indexes.setdefault(cls_name, {})
+            index = indexes.get(name)
+            if index is None:
+                index = indexes[name] = SortedIndex(name)
+                odict = FileStorage.__objects
+                for key in list(keys):
+                    index.add(key, odict[key])
+            return index
+
+    def __bitmap_index(self, cls_name, name):
+        """Return the BitmapIndex of name for cls_name, building it from
+        the stored objects the first time."""
+        with FileStorage.__lock:
+            keys = self.__class_index().get(cls_name, ())
+            indexes = FileStorage.__bitmap_indexes.setdefault(cls_name, {})
+            index = indexes.get(name)
+            if index is None:
+                index = indexes[name] = BitmapIndex(name)
+                odict = FileStorage.__objects
+                for key in list(keys):
+                    index.add(key, odict[key])
+            return index
+
+    def __column_store(self, cls_name):
+        """Return the Columns of the _numeric attributes of cls_name,
+        building them from the stored objects the first time."""
+        with FileStorage.__lock:
+            keys = self.__class_index().get(cls_name, ())
+            columns = FileStorage.__columns.get(cls_name)
+            if columns is None:
+                columns = FileStorage.__columns[cls_name] = Columns(
+                    classes[cls_name]._numeric)
+                odict = FileStorage.__objects
+                for key in list(keys):
+                    columns.add(key, odict[key])
+            return columns
+
+    def __groups(self, cls, name):
+        """Return the keys of the objects of cls by value of the attribute
+        name, read from its hash index if it has one."""
+        if name in cls._indexed:
+            buckets = self.__attr_index(cls.__name__, name).buckets
+            return {value: list(bucket) for value, bucket in buckets.items()}
+        groups = {}
+        for key, obj in self.all(cls).items():
+            try:
+                groups.setdefault(getattr(obj, name, None), []).append(key)
+            except TypeError:
+                pass
+        return groups
+
+    def __geo_index(self, cls):
+        """Return the GeoIndex of cls, building it from the stored objects
+        the first time, or None if cls has no _located attributes."""
+        with FileStorage.__lock:
+            if isinstance(cls, str):
+                cls = classes.get(cls)
+            if cls is None or not cls._located:
+                return None
+            keys = self.__class_index().get(cls.__name__, ())
+            index = FileStorage.__geo_indexes.get(cls.__name__)
+            if index is None:
+                index = GeoIndex(cls._located)
+                FileStorage.__geo_indexes[cls.__name__] = index
+                odict = FileStorage.__objects
+                for key in list(keys):
+                    index.add(key, odict[key])
+            return index
+
+    def __text_index(self, cls_name):
+        """Return the TextIndex of cls_name, loading it from the file next
+        to __file_path or building it from the stored objects the first
+        time."""
+        with FileStorage.__lock:
+            keys = self.__class_index().get(cls_name, ())
+            if cls_name not in FileStorage.__text_indexes:
+                self.__load_text_indexes()
+            index = FileStorage.__text_indexes.get(cls_name)
+            if index is None:
+                index = TextIndex(classes[cls_name]._searchable)
+                FileStorage.__text_indexes[cls_name] = index
+                FileStorage.__text_dirty.add(cls_name)
+                odict = FileStorage.__objects
+                for key in list(keys):
+                    index.add(key, odict[key])
+                FileStorage.__unindexed = {
+                    key for key in FileStorage.__unindexed
+                    if key.partition(".")[0] != cls_name}
+            return index
+
+    def __load_text_indexes(self):
+        """Load the missing text indexes whose stamps match the snapshot
+        files from the file next to __file_path, then bring them up to
+        date."""
+        with FileStorage.__lock:
+            by_class = self.__class_index()
+            missing = [name for name, cls in classes.items()
+                       if cls._searchable and
+                       name not in FileStorage.__text_indexes]
+            valid = self.__text_stamps().intersection(missing)
+            if not valid:
+                return
+            try:
+                with open(self.__text_path(), "rb") as f:
+                    states = marshal.loads(f.read())
+            except (OSError, EOFError, ValueError, TypeError):
+                return
+            if not isinstance(states, dict):
+                return
+            odict = FileStorage.__objects
+            loaded = set()
+            for cls_name in valid:
+                state = states.get(cls_name)
+                if state is None:
+                    continue
+                index = TextIndex(classes[cls_name]._searchable, state)
+                keys = by_class.get(cls_name, set())
+                changed = {key for key in index.docs if key not in keys}
+                changed.update(keys - index.docs.keys())
+                changed.update(key for key in FileStorage.__unindexed
+                               if key.partition(".")[0] == cls_name)
+                if changed:
+                    FileStorage.__text_dirty.add(cls_name)
+                for key in changed:
+                    index.discard(key)
+                    obj = odict.get(key)
+                    if obj is not None:
+                        index.add(key, obj)
+                FileStorage.__text_indexes[cls_name] = index
+                loaded.add(cls_name)
+            FileStorage.__unindexed = {
+                key for key in FileStorage.__unindexed
+                if key.partition(".")[0] not in loaded}
+
+    def __indexes(self, key, name=None):
+        """Return the built indexes of the class of key, or only those of
+        the attribute name when it is given.
+
+        If the text index of the class is not loaded yet, key is added to
+        __unindexed instead, so the index is fixed when it is loaded.
+        """
+        cls_name = key.partition(".")[0]
+        self.__class_index()
+        indexes = []
+        for by_class in (FileStorage.__attr_indexes,
+                         FileStorage.__range_indexes,
+                         FileStorage.__bitmap_indexes):
+            built = by_class.get(cls_name, {})
+            if name is None:
+                indexes.extend(built.values())
+            elif name in built:
+                indexes.append(built[name])
+        for index in (FileStorage.__columns.get(cls_name),
+                      FileStorage.__geo_indexes.get(cls_name)):
+            if index is not None and (name is None or name in index.names):
+                indexes.append(index)
+        cls = classes.get(cls_name)
+        if cls is not None and cls._searchable and (
+                name is None or name in cls._searchable):
+            index = FileStorage.__text_indexes.get(cls_name)
+            if index is not None:
+                indexes.append(index)
+                FileStorage.__text_dirty.add(cls_name)
+            else:
+                FileStorage.__unindexed.add(key)
+        return indexes
+
+    def __skipped_classes(self):
+        """Return __skipped, emptied if __objects was replaced since."""
+        if FileStorage.__skipped_of is not FileStorage.__objects:
+            FileStorage.__skipped = set()
+            FileStorage.__skipped_of = FileStorage.__objects
+        return FileStorage.__skipped
+
+    def __merge_partition(self, cls_name, deleted):
+        """Add to __objects the objects of the partition of cls_name that
+        are not there, except the deleted keys, so that rewriting the
+        partition keeps the objects reload() left out."""
+        odict = FileStorage.__objects
+        keys = self.__class_index().setdefault(cls_name, set())
+        try:
+            with open(self.__partition_path(cls_name)) as f:
+                for key, o in iter_entries(f):
+                    if key in deleted or dict.__contains__(odict, key):
+                        continue
+                    obj = self.__build(o)
+                    dict.__setitem__(odict, key, obj)
+                    keys.add(key)
+                    for index in self.__indexes(key):
+                        index.add(key, obj)
+        except FileNotFoundError:
+            pass
+
+    def __raw_index(self):
+        """Return __index, emptied if __objects was replaced since."""
+        if FileStorage.__indexed is not FileStorage.__objects:
+            FileStorage.__index = {}
+            FileStorage.__indexed = None
+        return FileStorage.__index
+
+    def __index_file(self, path):
+        """Add the byte range of every entry of path to __index.
+
+        Return False, indexing nothing, if path is not in the one entry
+        per line layout written by compact().
+        """
+        with open(path, "rb") as f:
+            if f.read(2) != b"{\n":
+                return False
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = FileStorage.__index
+        odict = FileStorage.__objects
+        pos, size = 2, len(mm)
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = size
+            if mm[pos:pos + 1] == b'"':
+                sep = mm.find(b'":', pos)
+                key = mm[pos + 1:sep]
+                key = (json.loads(b'"' + key + b'"') if b"\\" in key
+                       else key.decode())
+                stop = end - 1 if mm[end - 1:end] == b"," else end
+                dict.pop(odict, key, None)
+                index[key] = (mm, sep + 2, stop)
+            pos = end + 1
+        if index and isinstance(odict, LazyObjects):
+            odict.reset()
+        return True
+
+    @staticmethod
+    def __partition_path(cls_name):
+        """Return the path of the partition holding cls_name objects."""
+        root, ext = os.path.splitext(FileStorage.__file_path)
+        return "{}.{}{}".format(root, cls_name, ext)
+
+    @staticmethod
+    def __partitions():
+        """Return the names of the classes that have a partition file."""
+        root, ext = os.path.splitext(FileStorage.__file_path)
+        prefix = os.path.basename(root) + "."
+        found = []
+        for name in os.listdir(os.path.dirname(root) or "."):
+            if name.startswith(prefix) and name.endswith(ext):
+                cls_name = name[len(prefix):len(name) - len(ext)]
+                if cls_name and "." not in cls_name:
+                    found.append(cls_name)
+        return found
+
+    @staticmethod
+    def __build(o):
+        """Return the model instance described by the dictionary o."""
+        cls = classes[o["__class__"]]
+        if FileStorage.__compact:
+            cls = cls.compact()
+        return cls.from_dict(o)
+
+    @staticmethod
+    def __proxy(key, data):
+        """Return a proxy of the object stored under key as the JSON bytes
+        data, decoded only when one of its attributes is first used."""
+        cls = classes[key.partition(".")[0]]
+        if FileStorage.__compact:
+            cls = cls.compact()
+        return cls.proxy().from_json(data.decode())
+
+    @staticmethod
+    def __searchable(key):
+        """Return whether key names an object of a class with _searchable
+        attributes."""
+        cls = classes.get(key.partition(".")[0])
+        return cls is not None and bool(cls._searchable)
+
+    @staticmethod
+    def __text_path():
+        """Return the path of the text indexes kept next to __file_path."""
+        return FileStorage.__file_path + ".search"
+
+    def __stamp(self, cls_name):
+        """Return the path, modification time and size of the snapshot
+        file holding the objects of cls_name."""
+        if not FileStorage.__partitioned:
+            path = FileStorage.__file_path
+        else:
+            path = self.__partition_path(cls_name)
         try:
-            with open(FileStorage.__file_path) as f:
-                obj_dict = json.load(f)
-                for o in obj_dict.values():
-                    cls_name = o["__class__"]
-                    del o["__class__"]
-                    self.new(eval(cls_name)(**o))
+            st = os.stat(path)
         except FileNotFoundError:
+            return [path, None, None]
+        return [path, st.st_mtime_ns, st.st_size]
+
+    @staticmethod
+    def __log_path():
+        """Return the path of the log kept next to __file_path."""
+        return FileStorage.__file_path + ".log"
+
+    @staticmethod
+    def __sync_dir(path):
+        """Flush the directory entry of path to disk where supported."""
+        if not hasattr(os, "O_DIRECTORY"):
             return
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
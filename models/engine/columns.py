@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+"""
+Define the Columns class and the aggregates computed over its buffers.
+
+NumPy is used for the aggregates when it is installed; otherwise they run
+as single passes of the built-in functions over the array buffers.
+"""
+from array import array
+from math import floor, fsum
+from models.engine.indexes import orderable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+aggregates = ("count", "sum", "avg", "min", "max", "percentile", "histogram")
+
+
+def aggregate(func, values, *args):
+    """Return the aggregate func of values.
+
+    Args:
+        func (str): One of count, sum, avg, min, max, percentile (with the
+            percentage as argument) or histogram (with the number of bins
+            as argument, 10 by default).
+        values (array): The numbers to aggregate, as an array('d') without
+            NaN.
+        *args: The arguments of func.
+    """
+    if func not in aggregates:
+        raise ValueError("unknown aggregate {}".format(func))
+    if numpy is not None:
+        values = numpy.frombuffer(values, dtype=numpy.float64)
+    if func == "count":
+        return len(values)
+    if func == "histogram":
+        return histogram(values, *args)
+    if func == "sum":
+        return float(values.sum()) if numpy is not None else fsum(values)
+    if len(values) == 0:
+        return None
+    if func == "avg":
+        if numpy is not None:
+            return float(values.mean())
+        return fsum(values) / len(values)
+    if func == "min":
+        return float(min(values) if numpy is None else values.min())
+    if func == "max":
+        return float(max(values) if numpy is None else values.max())
+    return percentile(values, *args)
+
+
+def percentile(values, q):
+    """Return the q-th percentile of values, interpolating linearly
+    between the two closest ranks."""
+    if not 0 <= q <= 100:
+        raise ValueError("percentile must be between 0 and 100")
+    if numpy is not None:
+        return float(numpy.percentile(values, q))
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def histogram(values, bins=10):
+    """Return the (counts, edges) histogram of values over bins equal
+    bins spanning from their minimum to their maximum."""
+    if bins < 1:
+        raise ValueError("bins must be positive")
+    if len(values) == 0:
+        low, high = 0.0, 1.0
+    else:
+        low, high = float(min(values)), float(max(values))
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    if numpy is not None:
+        counts, edges = numpy.histogram(values, bins, (low, high))
+        return [int(n) for n in counts], [float(e) for e in edges]
+    width = (high - low) / bins
+    counts = [0] * bins
+    for value in values:
+        counts[min(int((value - low) / width), bins - 1)] += 1
+    return counts, [low + width * i for i in range(bins)] + [high]
+
+
+class Columns:
+    """Represent a columnar copy of the numeric attributes of the stored
+    objects of one class.
+
+    Every attribute is kept in an array('d') with one slot per object, so
+    aggregates read a contiguous buffer instead of the dictionary of
+    every object. A value that is not a number is held as NaN and left
+    out of the aggregates. Discarding a key moves the last slot into its
+    place, so the buffers never have holes.
+
+    Attributes:
+        names (tuple): The names of the attributes kept.
+        columns (dict): The array of every attribute, by name.
+        missing (dict): The number of NaN slots of every attribute.
+        slots (dict): The slot of every key.
+        keys (list): The key in every slot.
+    """
+
+    def __init__(self, names):
+        """Initialize empty columns of the attributes names."""
+        self.names = tuple(names)
+        self.columns = {name: array("d") for name in self.names}
+        self.missing = dict.fromkeys(self.names, 0)
+        self.slots = {}
+        self.keys = []
+
+    def add(self, key, obj):
+        """Copy the attributes of obj into the slot of key."""
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+            for name, column in self.columns.items():
+                column.append(0.0)
+        for name, column in self.columns.items():
+            value = getattr(obj, name, None)
+            value = float(value) if orderable(value) else float("nan")
+            self.missing[name] += (value != value) - (
+                column[slot] != column[slot])
+            column[slot] = value
+
+    def discard(self, key):
+        """Remove the slot of key if it is there."""
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        last = self.keys.pop()
+        if last != key:
+            self.keys[slot] = last
+            self.slots[last] = slot
+        for name, column in self.columns.items():
+            value = column.pop()
+            if slot < len(column):
+                value, column[slot] = column[slot], value
+            self.missing[name] -= value != value
+
+    def values(self, name, keys=None):
+        """Return the array of the numbers of the attribute name, of the
+        given keys only if keys is not None."""
+        column = self.columns[name]
+        if keys is not None:
+            slots = self.slots
+            column = array("d", [column[slots[key]] for key in keys
+                                 if key in slots])
+        elif not self.missing[name]:
+            return column
+        if numpy is not None:
+            found = numpy.frombuffer(column, dtype=numpy.float64)
+            return array("d", found[~numpy.isnan(found)].tobytes())
+        return array("d", [value for value in column if value == value])
+
+    def aggregate(self, func, name, *args, keys=None):
+        """Return the aggregate func of the attribute name, over the given
+        keys only if keys is not None."""
+        return aggregate(func, self.values(name, keys), *args)
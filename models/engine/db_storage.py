@@ -0,0 +1,655 @@
+#!/usr/bin/python3
+"""
+Define the DBStorage class.
+"""
+import os
+import json
+import sqlite3
+from array import array
+from heapq import merge
+from math import radians
+from models.engine.indexes import EARTH_RADIUS_KM, GeoIndex, orderable
+from models.engine.indexes import listed, tokens
+from models.engine.columns import aggregate, aggregates
+from models.engine.lazy_objects import LazyObjects
+from models.engine.query import Query
+from models.base_model import classes as registry
+# The model modules register their classes in registry when imported.
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+# The registered classes that have a table in the open database.
+classes = {}
+
+
+class DBStorage:
+    """Represent a storage engine backed by an SQLite database.
+
+    Every model class gets its own table of (id, data) rows, where data is
+    the JSON text of to_dict(). Objects are read when first looked up and
+    written one row at a time, so neither startup nor a save depends on
+    the number of stored objects.
+
+    Attributes:
+        __db_path (str): The name of the database file.
+        __connection (sqlite3.Connection): The open database connection.
+        __objects (LazyObjects): The objects loaded or created so far.
+        __pending (set): Keys of the objects created, changed or deleted
+            since the last save.
+        __compact (bool): Build loaded objects as the compact variant of
+            their class, which holds its declared attributes in slots.
+    """
+    __db_path = os.getenv("HBNB_DB_PATH", "hbnb.db")
+    __connection = None
+    __objects = None
+    __pending = set()
+    __compact = os.getenv("HBNB_COMPACT", "0") == "1"
+
+    def all(self, cls=None):
+        """Return the dictionary of stored objects, or a dictionary of the
+        objects of cls only when it is given.
+
+        Args:
+            cls (type or str): A model class or class name.
+        """
+        if cls is None:
+            return DBStorage.__objects
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in classes:
+            return {}
+        odict = DBStorage.__objects
+        prefix = cls + "."
+        objs = {key: obj for key, obj in dict.items(odict)
+                if key.startswith(prefix)}
+        rows = DBStorage.__connection.execute(
+            'SELECT id, data FROM "{}"'.format(cls))
+        for obj_id, data in rows:
+            key = prefix + obj_id
+            if key not in objs and key not in DBStorage.__pending:
+                obj = self.__build(cls, data)
+                dict.__setitem__(odict, key, obj)
+                objs[key] = obj
+        return objs
+
+    def count(self, cls=None, group_by=None):
+        """Return the number of stored objects, or of objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+            group_by (str): An attribute to count the objects of cls having
+                every value of separately, returning a dictionary of the
+                counts by value.
+        """
+        if cls is None:
+            return sum(self.count(name) for name in classes)
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if group_by is not None:
+            if cls not in classes or not group_by.isidentifier():
+                return {}
+            group, params = self.__group(classes[cls], group_by)
+            return dict(self.__read(cls, 'SELECT {0}, count(*) FROM "{1}" '
+                                    'GROUP BY {0}'.format(group, cls),
+                                    params))
+        if cls not in classes:
+            return 0
+        db = DBStorage.__connection
+        count, = db.execute('SELECT COUNT(*) FROM "{}"'.format(cls)).fetchone()
+        for key in DBStorage.__pending:
+            name, _, obj_id = key.partition(".")
+            if name != cls:
+                continue
+            stored = db.execute('SELECT 1 FROM "{}" WHERE id = ?'.format(cls),
+                                (obj_id,)).fetchone() is not None
+            loaded = dict.__contains__(DBStorage.__objects, key)
+            count += loaded - stored
+        return count
+
+    def new(self, obj):
+        """Set in the stored objects obj with key <obj_class_name>.id"""
+        if obj.__class__.__name__ not in classes:
+            with DBStorage.__connection as db:
+                self.__create_table(db, obj.__class__.__name__,
+                                    obj.__class__)
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        dict.__setitem__(DBStorage.__objects, key, obj)
+        DBStorage.__pending.add(key)
+
+    def delete(self, obj=None):
+        """Delete obj from the stored objects if it is stored there."""
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if key in DBStorage.__objects:
+            dict.pop(DBStorage.__objects, key)
+            DBStorage.__pending.add(key)
+
+    def lookup(self, cls, name, value):
+        """Return a dictionary of the objects of cls whose attribute name
+        equals value.
+
+        Attributes listed in the _indexed tuple of cls have an expression
+        index in the database, so the query reads only the matching rows.
+
+        Args:
+            cls (type or str): A model class or class name.
+            name (str): The attribute name.
+            value (any): The value to match.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in classes or not name.isidentifier():
+            return {}
+        if type(value) not in (str, int, float):
+            return {key: obj for key, obj in self.all(cls).items()
+                    if getattr(obj, name, None) == value}
+        odict = DBStorage.__objects
+        objs = {}
+        for key in DBStorage.__pending:
+            obj = dict.get(odict, key)
+            if (key.startswith(cls + ".") and obj is not None and
+                    getattr(obj, name, None) == value):
+                objs[key] = obj
+        rows = DBStorage.__connection.execute(
+            'SELECT id, data FROM "{}" WHERE json_extract(data, \'$.{}\') = ?'
+            .format(cls, name), (value,))
+        for obj_id, data in rows:
+            key = "{}.{}".format(cls, obj_id)
+            if key in DBStorage.__pending:
+                continue
+            obj = dict.get(odict, key)
+            if obj is None:
+                obj = self.__build(cls, data)
+                dict.__setitem__(odict, key, obj)
+            objs[key] = obj
+        return objs
+
+    def between(self, cls, name, low=None, high=None, *, include_low=True,
+                include_high=True, reverse=False):
+        """Yield in order the objects of cls whose numeric attribute name
+        lies between low and high.
+
+        Attributes listed in the _ranged tuple of cls have an expression
+        index in the database, so rows are read in order and only as the
+        generator is consumed.
+
+        Args:
+            cls (type or str): A model class or class name.
+            name (str): The attribute name.
+            low (int or float): The lower bound, or None for no bound.
+            high (int or float): The upper bound, or None for no bound.
+            include_low (bool): Whether a value equal to low is included.
+            include_high (bool): Whether a value equal to high is included.
+            reverse (bool): Whether to yield the largest values first.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in classes or not name.isidentifier():
+            return
+        odict = DBStorage.__objects
+
+        def inside(value):
+            if not orderable(value):
+                return False
+            if low is not None and (value < low or
+                                    value == low and not include_low):
+                return False
+            return high is None or not (value > high or
+                                        value == high and not include_high)
+
+        changed = []
+        for key in DBStorage.__pending:
+            obj = dict.get(odict, key)
+            if (key.startswith(cls + ".") and obj is not None and
+                    inside(getattr(obj, name, None))):
+                changed.append(obj)
+        changed.sort(key=lambda obj: getattr(obj, name), reverse=reverse)
+        column = self.__column(classes[cls], name)
+        sql = ['SELECT id, data FROM "{}" WHERE typeof({}) IN '
+               '(\'integer\', \'real\')'.format(cls, column)]
+        params = []
+        if low is not None:
+            sql.append("AND {} {} ?".format(column, ">=" if include_low
+                                            else ">"))
+            params.append(low)
+        if high is not None:
+            sql.append("AND {} {} ?".format(column, "<=" if include_high
+                                            else "<"))
+            params.append(high)
+        sql.append("ORDER BY {}{}".format(column, " DESC" if reverse else ""))
+
+        def stored():
+            rows = DBStorage.__connection.execute(" ".join(sql), params)
+            for obj_id, data in rows:
+                key = "{}.{}".format(cls, obj_id)
+                if key in DBStorage.__pending:
+                    continue
+                obj = dict.get(odict, key)
+                if obj is None:
+                    obj = self.__build(cls, data)
+                    dict.__setitem__(odict, key, obj)
+                if inside(getattr(obj, name, None)):
+                    yield obj
+
+        yield from merge(changed, stored(),
+                         key=lambda obj: getattr(obj, name), reverse=reverse)
+
+    def having(self, cls, name, values):
+        """Return a dictionary of the objects of cls whose list attribute
+        name holds every element of values.
+
+        The rows are matched in the database by counting the elements of
+        values found in each stored list.
+
+        Args:
+            cls (type or str): A model class or class name.
+            name (str): The list attribute name.
+            values (iterable): The elements to match.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in classes or not name.isidentifier():
+            return {}
+        values = set(values)
+        if not values or any(type(value) not in (str, int, float)
+                             for value in values):
+            return {key: obj for key, obj in self.all(cls).items()
+                    if all(value in listed(obj, name) for value in values)}
+        odict = DBStorage.__objects
+        objs = {}
+        for key in DBStorage.__pending:
+            obj = dict.get(odict, key)
+            if (key.startswith(cls + ".") and obj is not None and
+                    all(value in listed(obj, name) for value in values)):
+                objs[key] = obj
+        rows = DBStorage.__connection.execute(
+            'SELECT id, data FROM "{}" WHERE (SELECT count(DISTINCT value) '
+            'FROM json_each(data, \'$.{}\') WHERE value IN ({})) = ?'
+            .format(cls, name, ", ".join("?" * len(values))),
+            (*values, len(values)))
+        for obj_id, data in rows:
+            key = "{}.{}".format(cls, obj_id)
+            if key in DBStorage.__pending:
+                continue
+            obj = dict.get(odict, key)
+            if obj is None:
+                obj = self.__build(cls, data)
+                dict.__setitem__(odict, key, obj)
+            objs[key] = obj
+        return objs
+
+    def places_having(self, amenity_ids):
+        """Return a dictionary of the places having every amenity of
+        amenity_ids."""
+        return self.having(Place, "amenity_ids", amenity_ids)
+
+    def aggregate(self, cls, func, name, *args, group_by=None):
+        """Return the aggregate func of the numeric attribute name over the
+        objects of cls, leaving out those where it is not a number.
+
+        Counts, sums, averages, minimums and maximums are computed by the
+        database; percentiles and histograms over the numbers it returns.
+        Unsaved changes are written in a savepoint rolled back afterwards.
+
+        Args:
+            cls (type or str): A model class or class name.
+            func (str): One of count, sum, avg, min, max, percentile or
+                histogram.
+            name (str): The numeric attribute name.
+            *args: The percentage of percentile or the number of bins of
+                histogram.
+            group_by (str): An attribute to aggregate every value of
+                separately, returning a dictionary of the results by value.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if func not in aggregates:
+            raise ValueError("unknown aggregate {}".format(func))
+        if (cls not in classes or not name.isidentifier() or
+                group_by is not None and not group_by.isidentifier()):
+            return {} if group_by else aggregate(func, array("d"), *args)
+        column = self.__column(classes[cls], name)
+        group, params = "NULL", ()
+        if group_by is not None:
+            group, params = self.__group(classes[cls], group_by)
+        where = "typeof({}) IN ('integer', 'real')".format(column)
+        if func in ("percentile", "histogram"):
+            rows = self.__read(cls, 'SELECT {}, {} FROM "{}" WHERE {}'.format(
+                group, column, cls, where), params)
+            groups = {}
+            for value, number in rows:
+                groups.setdefault(value, array("d")).append(number)
+            results = {value: aggregate(func, numbers, *args)
+                       for value, numbers in groups.items()}
+        else:
+            sql_func = {"count": "count", "sum": "total"}.get(func, func)
+            rows = self.__read(cls, 'SELECT {0}, {1}({2}) FROM "{3}" WHERE '
+                               '{4} GROUP BY {0}'.format(
+                                   group, sql_func, column, cls, where),
+                               params)
+            results = {value: result if func == "count" else float(result)
+                       for value, result in rows}
+        if group_by is not None:
+            return results
+        if None in results:
+            return results[None]
+        return aggregate(func, array("d"), *args)
+
+    def within(self, cls, south, west, north, east):
+        """Return the list of objects of cls located inside a bounding box.
+
+        The box crosses the antimeridian when west is greater than east.
+
+        Args:
+            cls (type or str): A model class or class name with a _located
+                pair of attributes.
+            south (float): The southern latitude.
+            west (float): The western longitude.
+            north (float): The northern latitude.
+            east (float): The eastern longitude.
+        """
+        band = self.__band(cls, south, north)
+        if band is None:
+            return []
+        index, objs = band
+        return [objs[key] for key in index.within(south, west, north, east)]
+
+    def near(self, cls, lat, lon, k=10):
+        """Return the list of the k objects of cls closest to a location,
+        closest first.
+
+        Rows are read from the latitude index in a band around the
+        location that grows until it holds k objects closer than its edge.
+
+        Args:
+            cls (type or str): A model class or class name with a _located
+                pair of attributes.
+            lat (float): The latitude of the location.
+            lon (float): The longitude of the location.
+            k (int): The number of objects to return.
+        """
+        radius = 1.0
+        while True:
+            band = self.__band(cls, lat - radius, lat + radius)
+            if band is None:
+                return []
+            index, objs = band
+            found = index.nearest(lat, lon, k)
+            whole = lat - radius <= -90 and lat + radius >= 90
+            if whole or (len(found) == k and
+                         found[-1][0] <= EARTH_RADIUS_KM * radians(radius)):
+                return [objs[key] for _, key in found]
+            radius *= 4
+
+    def places_near(self, lat, lon, k=10):
+        """Return the list of the k places closest to a location."""
+        return self.near(Place, lat, lon, k)
+
+    def search(self, cls, text, k=None):
+        """Return the list of objects of cls whose _searchable attributes
+        hold words of text, best match first.
+
+        Classes with _searchable attributes have a full-text table in the
+        database, ranked with BM25. Unsaved changes are written to it in
+        a savepoint that is rolled back once the matches are read.
+
+        Args:
+            cls (type or str): A model class or class name.
+            text (str): The words to look for.
+            k (int): The number of objects to return, or None for all.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        words = tokens(text)
+        if cls not in classes or not classes[cls]._searchable or not words:
+            return []
+        sql = ('SELECT m.id, m.data FROM "{0}_search" s JOIN "{0}" m '
+               'ON m.rowid = s.rowid WHERE "{0}_search" MATCH ? '
+               'ORDER BY bm25("{0}_search")'.format(cls))
+        if k is not None:
+            sql += " LIMIT {:d}".format(k)
+        match = " OR ".join('"{}"'.format(word) for word in set(words))
+        rows = self.__read(cls, sql, (match,))
+        odict = DBStorage.__objects
+        objs = []
+        for obj_id, data in rows:
+            key = "{}.{}".format(cls, obj_id)
+            obj = dict.get(odict, key)
+            if obj is None:
+                obj = self.__build(cls, data)
+                dict.__setitem__(odict, key, obj)
+            objs.append(obj)
+        return objs
+
+    def query(self, cls):
+        """Return a Query of the objects of cls.
+
+        Args:
+            cls (type or str): A model class or class name.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        return Query(self, cls)
+
+    def touch(self, obj, name=None):
+        """Mark a loaded obj as changed so the next save persists it.
+
+        An object that is not the one loaded under its key, such as a copy
+        or one held across reload(), is ignored.
+
+        Args:
+            obj (BaseModel): The changed object.
+            name (str): The attribute that changed, or None if any may have.
+        """
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if dict.get(DBStorage.__objects, key) is obj:
+            DBStorage.__pending.add(key)
+
+    def save(self):
+        """Write the objects changed since the last save in one
+        transaction."""
+        pending, DBStorage.__pending = DBStorage.__pending, set()
+        try:
+            with DBStorage.__connection as db:
+                self.__apply(db, pending)
+        except BaseException:
+            DBStorage.__pending.update(pending)
+            raise
+
+    def flush(self):
+        """Write every change made so far to the database."""
+        self.save()
+
+    def reload(self):
+        """Open the database, creating missing tables.
+
+        No object is read here; objects are loaded when looked up.
+        """
+        if DBStorage.__connection is not None:
+            DBStorage.__connection.close()
+        db = sqlite3.connect(DBStorage.__db_path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        classes.clear()
+        with db:
+            for cls_name, cls in list(registry.items()):
+                self.__create_table(db, cls_name, cls)
+        DBStorage.__connection = db
+        DBStorage.__objects = LazyObjects(self)
+        DBStorage.__pending = set()
+
+    def close(self):
+        """Close the database connection."""
+        if DBStorage.__connection is not None:
+            DBStorage.__connection.close()
+            DBStorage.__connection = None
+
+    def fetch(self, key):
+        """Return the object stored under key in the database, or None."""
+        cls_name, _, obj_id = key.partition(".")
+        if cls_name not in classes or key in DBStorage.__pending:
+            return None
+        row = DBStorage.__connection.execute(
+            'SELECT data FROM "{}" WHERE id = ?'.format(cls_name),
+            (obj_id,)).fetchone()
+        if row is None:
+            return None
+        return self.__build(cls_name, row[0])
+
+    def fetch_all(self):
+        """Yield (key, object) for every object stored in the database."""
+        for cls_name in classes:
+            rows = DBStorage.__connection.execute(
+                'SELECT id, data FROM "{}"'.format(cls_name))
+            for obj_id, data in rows:
+                key = "{}.{}".format(cls_name, obj_id)
+                if key not in DBStorage.__pending:
+                    yield key, self.__build(cls_name, data)
+
+    def __band(self, cls, south, north):
+        """Return a GeoIndex of the objects of cls between two latitudes and
+        the dictionary of those objects, or None if cls has no _located
+        attributes."""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None or not cls._located:
+            return None
+        cls_name, (lat_name, lon_name) = cls.__name__, cls._located
+        index = GeoIndex(cls._located)
+        odict = DBStorage.__objects
+        objs = {}
+        for key in DBStorage.__pending:
+            obj = dict.get(odict, key)
+            if key.startswith(cls_name + ".") and obj is not None:
+                objs[key] = obj
+        column = self.__column(cls, lat_name)
+        rows = DBStorage.__connection.execute(
+            'SELECT id, data FROM "{}" WHERE {} BETWEEN ? AND ?'
+            .format(cls_name, column), (south, north))
+        for obj_id, data in rows:
+            key = "{}.{}".format(cls_name, obj_id)
+            if key in DBStorage.__pending:
+                continue
+            obj = dict.get(odict, key)
+            if obj is None:
+                obj = self.__build(cls_name, data)
+                dict.__setitem__(odict, key, obj)
+            objs[key] = obj
+        for key, obj in objs.items():
+            index.add(key, obj)
+        return index, objs
+
+    def __read(self, cls_name, sql, params=()):
+        """Return the rows of sql as if the unsaved changes to the objects
+        of cls_name were saved.
+
+        The changes are written in a savepoint that is rolled back once
+        the rows are read.
+        """
+        db = DBStorage.__connection
+        db.execute("SAVEPOINT read")
+        try:
+            self.__apply(db, [key for key in DBStorage.__pending
+                              if key.startswith(cls_name + ".")])
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.execute("ROLLBACK TO read")
+            db.execute("RELEASE read")
+
+    def __apply(self, db, keys):
+        """Write the objects stored under keys to db, deleting the rows of
+        the keys no longer stored, along with their full-text rows."""
+        odict = DBStorage.__objects
+        for key in keys:
+            cls_name, obj_id = key.split(".", 1)
+            cls = classes.get(cls_name)
+            if cls is None:
+                continue
+            if cls._searchable:
+                db.execute('DELETE FROM "{0}_search" WHERE rowid = '
+                           '(SELECT rowid FROM "{0}" WHERE id = ?)'
+                           .format(cls_name), (obj_id,))
+            if not dict.__contains__(odict, key):
+                db.execute('DELETE FROM "{}" WHERE id = ?'.format(cls_name),
+                           (obj_id,))
+                continue
+            db.execute('INSERT INTO "{}" (id, data) VALUES (?, ?) ON '
+                       'CONFLICT (id) DO UPDATE SET data = excluded.data'
+                       .format(cls_name), (obj_id, odict[key].to_json()))
+            if cls._searchable:
+                db.execute('INSERT INTO "{0}_search" (rowid, body) SELECT '
+                           'rowid, {1} FROM "{0}" WHERE id = ?'
+                           .format(cls_name, self.__body(cls)), (obj_id,))
+
+    def __create_table(self, db, cls_name, cls):
+        """Create the table of cls and its indexes if they are missing,
+        and add cls to classes."""
+        db.execute('CREATE TABLE IF NOT EXISTS "{}" (id TEXT PRIMARY KEY, '
+                   'data TEXT NOT NULL)'.format(cls_name))
+        for name in cls._indexed:
+            db.execute('CREATE INDEX IF NOT EXISTS "{0}_{1}" ON '
+                       '"{0}" (json_extract(data, \'$.{1}\'))'
+                       .format(cls_name, name))
+        if cls._located:
+            db.execute('CREATE INDEX IF NOT EXISTS "{}_located" ON "{}" ({})'
+                       .format(cls_name, cls_name,
+                               self.__column(cls, cls._located[0])))
+        if cls._searchable:
+            self.__create_search(db, cls_name, cls)
+        for name in cls._ranged:
+            db.execute('CREATE INDEX IF NOT EXISTS "{}_{}_order" ON "{}" ({})'
+                       .format(cls_name, name, cls_name,
+                               self.__column(cls, name)))
+        classes[cls_name] = cls
+
+    def __create_search(self, db, cls_name, cls):
+        """Create the full-text table of cls if it is missing, filling it
+        from the rows already stored."""
+        found = db.execute("SELECT 1 FROM sqlite_master WHERE name = ?",
+                           (cls_name + "_search",)).fetchone()
+        if found is not None:
+            return
+        db.execute('CREATE VIRTUAL TABLE "{}_search" USING fts5(body)'
+                   .format(cls_name))
+        db.execute('INSERT INTO "{0}_search" (rowid, body) SELECT rowid, {1} '
+                   'FROM "{0}"'.format(cls_name, self.__body(cls)))
+
+    @staticmethod
+    def __body(cls):
+        """Return the SQL expression of the searchable text of cls."""
+        return " || ' ' || ".join(
+            "coalesce(json_extract(data, '$.{}'), '')".format(name)
+            for name in cls._searchable)
+
+    @staticmethod
+    def __column(cls, name):
+        """Return the SQL expression of the attribute name of cls, falling
+        back to the class default when it is a number."""
+        column = "json_extract(data, '$.{}')".format(name)
+        default = getattr(cls, name, None)
+        if orderable(default):
+            column = "coalesce({}, {!r})".format(column, default)
+        return column
+
+    @staticmethod
+    def __group(cls, name):
+        """Return the SQL expression of the attribute name of cls to group
+        rows by, falling back to the class default, and its parameters."""
+        group = "json_extract(data, '$.{}')".format(name)
+        default = getattr(cls, name, None)
+        if type(default) in (str, int, float):
+            return "coalesce({}, ?1)".format(group), (default,)
+        return group, ()
+
+    @staticmethod
+    def __build(cls_name, data):
+        """Return the model instance described by the JSON text data."""
+        cls = classes[cls_name]
+        if DBStorage.__compact:
+            cls = cls.compact()
+        return cls.from_dict(json.loads(data))
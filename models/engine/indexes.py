@@ -0,0 +1,627 @@
+#!/usr/bin/python3
+"""
+Define the index classes used by the storage engines.
+"""
+import re
+import heapq
+from bisect import bisect_left, insort
+from math import acos, asin, cos, degrees, floor, log, radians, sin
+
+EARTH_RADIUS_KM = 6371.0088
+_word = re.compile(r"\w+")
+
+
+def tokens(text):
+    """Return the lowercase words of text."""
+    return _word.findall(text.lower())
+
+
+class AttributeIndex:
+    """Represent a hash index of stored objects by one attribute.
+
+    Every bucket maps keys to their objects, so it doubles as a cache of
+    the objects sharing a value, kept current as objects change.
+
+    Attributes:
+        name (str): The name of the indexed attribute.
+        values (dict): The indexed value of every key.
+        buckets (dict): The objects holding every indexed value, by key.
+    """
+
+    def __init__(self, name):
+        """Initialize an empty index of the attribute name."""
+        self.name = name
+        self.values = {}
+        self.buckets = {}
+
+    def add(self, key, obj):
+        """Index obj under key, replacing its previous value."""
+        value = getattr(obj, self.name, None)
+        old = self.values.get(key, self)
+        if old is not self:
+            if old == value and type(old) is type(value):
+                self.buckets[old][key] = obj
+                return
+            self.discard(key)
+        try:
+            self.buckets.setdefault(value, {})[key] = obj
+        except TypeError:
+            return
+        self.values[key] = value
+
+    def discard(self, key):
+        """Remove key from the index if it is there."""
+        value = self.values.pop(key, self)
+        if value is self:
+            return
+        bucket = self.buckets[value]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[value]
+
+    def lookup(self, value):
+        """Return the objects whose attribute equals value, by key."""
+        try:
+            return self.buckets.get(value, {})
+        except TypeError:
+            return {}
+
+
+def orderable(value):
+    """Return whether value is a number a SortedIndex can hold."""
+    return isinstance(value, (int, float)) and value == value
+
+
+class _Top:
+    """Represent a bound that compares greater than any key."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+TOP = _Top()
+
+
+class SortedIndex:
+    """Represent a sorted index of stored objects by one numeric attribute.
+
+    The (value, key) pairs are kept in ascending order in blocks of at
+    most 2 * block_size pairs, so adding or discarding a key bisects
+    straight to its pair and only shifts one block, however many keys
+    share its value. Keys whose value is not a number are remembered but
+    left out of the order, so ranges never include them.
+
+    Attributes:
+        block_size (int): Half the largest number of pairs in a block.
+        name (str): The name of the indexed attribute.
+        values (dict): The indexed value of every key.
+        blocks (list): The sorted lists of (value, key) pairs.
+        maxes (list): The last pair of every block.
+    """
+
+    block_size = 512
+
+    def __init__(self, name):
+        """Initialize an empty index of the attribute name."""
+        self.name = name
+        self.values = {}
+        self.blocks = []
+        self.maxes = []
+
+    def add(self, key, obj):
+        """Index obj under key, replacing its previous value."""
+        value = getattr(obj, self.name, None)
+        old = self.values.get(key, self)
+        if old is not self:
+            if old == value and type(old) is type(value):
+                return
+            self.discard(key)
+        self.values[key] = value
+        if not orderable(value):
+            return
+        pair = (value, key)
+        if not self.blocks:
+            self.blocks.append([pair])
+            self.maxes.append(pair)
+            return
+        b = min(bisect_left(self.maxes, pair), len(self.maxes) - 1)
+        block = self.blocks[b]
+        insort(block, pair)
+        if len(block) > 2 * self.block_size:
+            self.blocks.insert(b + 1, block[self.block_size:])
+            self.maxes.insert(b + 1, block[-1])
+            del block[self.block_size:]
+        self.maxes[b] = block[-1]
+
+    def discard(self, key):
+        """Remove key from the index if it is there."""
+        value = self.values.pop(key, self)
+        if value is self or not orderable(value):
+            return
+        pair = (value, key)
+        b = bisect_left(self.maxes, pair)
+        block = self.blocks[b]
+        del block[bisect_left(block, pair)]
+        if block:
+            self.maxes[b] = block[-1]
+        else:
+            del self.blocks[b]
+            del self.maxes[b]
+
+    def __locate(self, bound):
+        """Return the (block, position) of the first pair not below bound."""
+        b = bisect_left(self.maxes, bound)
+        if b == len(self.blocks):
+            return b, 0
+        return b, bisect_left(self.blocks[b], bound)
+
+    def between(self, low=None, high=None, include_low=True,
+                include_high=True, reverse=False):
+        """Yield in order the keys whose value lies between low and high.
+
+        Args:
+            low (int or float): The lower bound, or None for no bound.
+            high (int or float): The upper bound, or None for no bound.
+            include_low (bool): Whether a value equal to low is included.
+            include_high (bool): Whether a value equal to high is included.
+            reverse (bool): Whether to yield the largest values first.
+        """
+        start, stop = (0, 0), (len(self.blocks), 0)
+        if low is not None:
+            start = self.__locate((low,) if include_low else (low, TOP))
+        if high is not None:
+            stop = self.__locate((high, TOP) if include_high else (high,))
+        spans = []
+        for b in range(start[0], min(stop[0], len(self.blocks) - 1) + 1):
+            i = start[1] if b == start[0] else 0
+            j = stop[1] if b == stop[0] else len(self.blocks[b])
+            spans.append((b, i, j))
+        if reverse:
+            spans.reverse()
+        for b, i, j in spans:
+            if b >= len(self.blocks):
+                continue
+            pairs = self.blocks[b][i:j]
+            if reverse:
+                pairs.reverse()
+            for value, key in pairs:
+                yield key
+
+
+def listed(obj, name):
+    """Return the list attribute name of obj, or () if it has none.
+
+    The list is read from the attributes set on obj, so an empty class
+    default is never copied into it.
+    """
+    values = obj._stored(name)
+    if isinstance(values, (list, tuple, set, frozenset)):
+        return values
+    return ()
+
+
+def ones(bitmap):
+    """Yield the positions of the set bits of bitmap, lowest first."""
+    bits = bin(bitmap)[:1:-1]
+    i = bits.find("1")
+    while i >= 0:
+        yield i
+        i = bits.find("1", i + 1)
+
+
+class BitmapIndex:
+    """Represent a bitmap index of stored objects by a list attribute.
+
+    Every element found in the lists (an Amenity id for Place.amenity_ids)
+    is given a bit, and every object the mask of the bits of its list. The
+    index also keeps one column per bit, with a bit per object slot, so
+    the objects holding several elements are found by ANDing the columns
+    of those elements.
+
+    Attributes:
+        name (str): The name of the indexed list attribute.
+        bits (dict): The bit position of every element.
+        masks (dict): The bitmap of the elements of every key.
+        slots (dict): The slot of every key.
+        entries (list): The (key, obj) pair in every slot, or None.
+        columns (list): The bytearray of the slots holding every bit.
+        free (list): The slots released by discarded keys.
+    """
+
+    def __init__(self, name):
+        """Initialize an empty index of the list attribute name."""
+        self.name = name
+        self.bits = {}
+        self.masks = {}
+        self.slots = {}
+        self.entries = []
+        self.columns = []
+        self.free = []
+
+    def add(self, key, obj):
+        """Index obj under key, replacing its previous elements."""
+        mask = 0
+        for value in listed(obj, self.name):
+            try:
+                bit = self.bits.get(value)
+            except TypeError:
+                continue
+            if bit is None:
+                bit = self.bits[value] = len(self.columns)
+                self.columns.append(bytearray())
+            mask |= 1 << bit
+        slot = self.slots.get(key)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                slot = len(self.entries)
+                self.entries.append(None)
+            self.slots[key] = slot
+        self.entries[slot] = (key, obj)
+        old = self.masks.get(key, 0)
+        self.masks[key] = mask
+        if mask == old:
+            return
+        byte, flag = slot >> 3, 1 << (slot & 7)
+        columns = self.columns
+        for bit in ones(old & ~mask):
+            columns[bit][byte] ^= flag
+        for bit in ones(mask & ~old):
+            column = columns[bit]
+            if len(column) <= byte:
+                column.extend(bytes(byte + 1 - len(column)))
+            column[byte] |= flag
+
+    def discard(self, key):
+        """Remove key from the index if it is there."""
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        byte, flag = slot >> 3, 1 << (slot & 7)
+        for bit in ones(self.masks.pop(key)):
+            self.columns[bit][byte] ^= flag
+        self.entries[slot] = None
+        self.free.append(slot)
+
+    def having(self, values):
+        """Return the objects whose list holds every element of values,
+        by key."""
+        columns = []
+        for value in set(values):
+            try:
+                bit = self.bits.get(value)
+            except TypeError:
+                return {}
+            if bit is None:
+                return {}
+            columns.append(self.columns[bit])
+        if not columns:
+            return dict(entry for entry in self.entries if entry is not None)
+        columns.sort(key=len)
+        bitmap = int.from_bytes(columns[0], "little")
+        for column in columns[1:]:
+            if not bitmap:
+                break
+            bitmap &= int.from_bytes(column, "little")
+        entries = self.entries
+        return dict(entries[slot] for slot in ones(bitmap))
+
+
+class TextIndex:
+    """Represent an inverted index of stored objects by the words of some
+    text attributes, ranked with BM25.
+
+    Attributes:
+        names (tuple): The names of the indexed text attributes.
+        docs (dict): The number of occurrences of every word, by key.
+        postings (dict): The number of occurrences by key, by word.
+        lengths (dict): The number of words of every key.
+        total (int): The number of words of all keys.
+    """
+
+    def __init__(self, names, state=None):
+        """Initialize an index of the attributes names, empty or holding
+        the (docs, postings, lengths) state of another index."""
+        self.names = tuple(names)
+        self.docs, self.postings, self.lengths = state or ({}, {}, {})
+        self.total = sum(self.lengths.values())
+
+    def state(self):
+        """Return the (docs, postings, lengths) that rebuild the index."""
+        return self.docs, self.postings, self.lengths
+
+    def add(self, key, obj):
+        """Index obj under key, replacing its previous words."""
+        counts = {}
+        for name in self.names:
+            text = getattr(obj, name, None)
+            if isinstance(text, str):
+                for word in tokens(text):
+                    counts[word] = counts.get(word, 0) + 1
+        if self.docs.get(key) == counts:
+            return
+        self.discard(key)
+        self.__insert(key, counts)
+
+    def discard(self, key):
+        """Remove key from the index if it is there."""
+        counts = self.docs.pop(key, None)
+        if counts is None:
+            return
+        for word in counts:
+            posting = self.postings[word]
+            del posting[key]
+            if not posting:
+                del self.postings[word]
+        self.total -= self.lengths.pop(key)
+
+    def search(self, text, k=None):
+        """Return the (score, key) of the keys holding words of text, best
+        first.
+
+        Args:
+            text (str): The words to look for.
+            k (int): The number of keys to return, or None for all.
+        """
+        k1, b = 1.2, 0.75
+        scores = {}
+        n = len(self.docs)
+        average = self.total / n if self.total else 1
+        for word in set(tokens(text)):
+            posting = self.postings.get(word, {})
+            idf = log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, count in posting.items():
+                norm = 1 - b + b * self.lengths[key] / average
+                scores[key] = (scores.get(key, 0) +
+                               idf * count * (k1 + 1) / (count + k1 * norm))
+        ranked = ((score, key) for key, score in scores.items())
+        if k is None:
+            return sorted(ranked, reverse=True)
+        return heapq.nlargest(k, ranked)
+
+    def __insert(self, key, counts):
+        """Add the word counts of key, which is not in the index."""
+        self.docs[key] = counts
+        for word, count in counts.items():
+            self.postings.setdefault(word, {})[key] = count
+        self.lengths[key] = sum(counts.values())
+        self.total += self.lengths[key]
+
+
+class GeoIndex:
+    """Represent a grid index of stored objects by latitude and longitude.
+
+    The globe is cut into cells of cell degrees on each side, and cells
+    are grouped into nested blocks of growing size. A bounding box only
+    visits the cells it overlaps, and a nearest search opens the blocks
+    closest to the point first and stops as soon as no unopened block can
+    hold a closer object, so both cost about the objects near the answer.
+
+    Attributes:
+        names (tuple): The names of the latitude and longitude attributes.
+        cell (float): The side of a cell, in degrees.
+        points (dict): The (latitude, longitude, x, y, z) of every key,
+            x, y and z being the unit vector of the location.
+        cells (dict): The set of keys in every non-empty (row, col) cell.
+    """
+
+    def __init__(self, names, cell=0.1):
+        """Initialize an empty index of the attribute pair names."""
+        self.names = tuple(names)
+        self.cell = cell
+        self.points = {}
+        self.cells = {}
+        self.__rows = int(round(180 / cell))
+        self.__cols = 2 * self.__rows
+        self.__sizes = [1] + [size for size in (6, 30, 150, 900)
+                              if self.__rows % size == 0]
+        self.__groups = [self.cells] + [{} for size in self.__sizes[1:]]
+        self.__centers = {}
+
+    def add(self, key, obj):
+        """Index obj under key, replacing its previous location."""
+        lat = getattr(obj, self.names[0], None)
+        lon = getattr(obj, self.names[1], None)
+        old = self.points.get(key)
+        if old is not None and old[:2] == (lat, lon):
+            return
+        self.discard(key)
+        if not (orderable(lat) and orderable(lon) and -90 <= lat <= 90 and
+                abs(lon) != float("inf")):
+            return
+        self.points[key] = (lat, lon) + self.__vector(lat, lon)
+        cell = self.__cell(lat, lon)
+        bucket = self.cells.setdefault(cell, set())
+        bucket.add(key)
+        for level in range(1, len(self.__sizes)):
+            if len(bucket) > 1:
+                break
+            size = self.__sizes[level]
+            bucket = self.__groups[level].setdefault(
+                (cell[0] // size, cell[1] // size), set())
+            bucket.add((cell[0] // self.__sizes[level - 1],
+                        cell[1] // self.__sizes[level - 1]))
+
+    def discard(self, key):
+        """Remove key from the index if it is there."""
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self.__cell(point[0], point[1])
+        child = key
+        for level, size in enumerate(self.__sizes):
+            block = (cell[0] // size, cell[1] // size)
+            group = self.__groups[level]
+            group[block].discard(child)
+            if group[block]:
+                break
+            del group[block]
+            child = block
+
+    def within(self, south, west, north, east):
+        """Return the keys located inside a bounding box.
+
+        The box crosses the antimeridian when west is greater than east.
+
+        Args:
+            south (float): The southern latitude.
+            west (float): The western longitude.
+            north (float): The northern latitude.
+            east (float): The eastern longitude.
+        """
+        if east - west >= 360:
+            return self.__box(south, -180, north, 180)
+        west, east = self.__wrap(west), self.__wrap(east)
+        if east < west:
+            return (self.__box(south, west, north, 180) +
+                    self.__box(south, -180, north, east))
+        return self.__box(south, west, north, east)
+
+    def nearest(self, lat, lon, k):
+        """Return the (distance in km, key) of the k keys closest to a
+        location, closest first.
+
+        The cells around the location are read first, which settles most
+        searches; otherwise blocks are opened closest first.
+        """
+        x, y, z = self.__vector(lat, lon)
+        best = []
+        seen = set()
+
+        def done(bound):
+            return (len(best) == k and
+                    best[0][0] >= cos(radians(max(bound, 0))))
+
+        def visit(cell):
+            seen.add(cell)
+            for key in self.cells.get(cell, ()):
+                px, py, pz = self.points[key][2:]
+                dot = x * px + y * py + z * pz
+                if len(best) < k:
+                    heapq.heappush(best, (dot, key))
+                elif dot > best[0][0]:
+                    heapq.heapreplace(best, (dot, key))
+
+        if k <= 0:
+            return []
+        row0, col0 = self.__cell(lat, lon)
+        for r in range(3):
+            for row in range(max(row0 - r, 0), min(row0 + r + 1, self.__rows)):
+                if abs(row - row0) == r:
+                    ring = range(col0 - r, col0 + r + 1)
+                else:
+                    ring = (col0 - r, col0 + r)
+                for col in ring:
+                    if (row, col % self.__cols) not in seen:
+                        visit((row, col % self.__cols))
+            if done(self.__square(lat, lon, row0, col0, r)):
+                return self.__ranked(best)
+        centers = self.__centers
+        top = len(self.__sizes) - 1
+        queue = []
+        for block in self.__groups[top]:
+            cx, cy, cz, side = centers.get((top, block)) or self.__center(
+                top, block)
+            dot = max(-1.0, min(1.0, x * cx + y * cy + z * cz))
+            queue.append((degrees(acos(dot)) - side, top, block))
+        heapq.heapify(queue)
+        while queue:
+            bound, level, block = heapq.heappop(queue)
+            if done(bound):
+                break
+            if level == 0:
+                if block not in seen:
+                    visit(block)
+                continue
+            level -= 1
+            for child in self.__groups[level + 1][block]:
+                cx, cy, cz, side = (centers.get((level, child)) or
+                                    self.__center(level, child))
+                dot = max(-1.0, min(1.0, x * cx + y * cy + z * cz))
+                heapq.heappush(queue, (degrees(acos(dot)) - side, level,
+                                       child))
+        return self.__ranked(best)
+
+    def __box(self, south, west, north, east):
+        """Return the keys inside a box with -180 <= west <= east <= 180."""
+        first, col0 = self.__cell(max(south, -90), west)
+        last = self.__cell(min(north, 90), west)[0]
+        col1 = min(int(floor((east + 180) / self.cell)), self.__cols - 1)
+        rows, cols = range(first, last + 1), range(col0, col1 + 1)
+        if len(rows) * len(cols) > len(self.cells):
+            cells = [cell for cell in self.cells
+                     if cell[0] in rows and cell[1] in cols]
+        else:
+            cells = [(row, col) for row in rows for col in cols]
+        keys = []
+        for cell in cells:
+            for key in self.cells.get(cell, ()):
+                lat, lon = self.points[key][:2]
+                if south <= lat <= north and west <= self.__wrap(lon) <= east:
+                    keys.append(key)
+        return keys
+
+    def __square(self, lat, lon, row0, col0, r):
+        """Return the least distance in degrees from a location in cell
+        (row0, col0) to any point outside the square of cells r rings
+        around it.
+
+        Leaving the square means crossing one of its parallels or one of
+        the great circles of its meridians.
+        """
+        south = (row0 - r) * self.cell - 90
+        north = (row0 + r + 1) * self.cell - 90
+        bounds = [180]
+        if south > -90:
+            bounds.append(lat - south)
+        if north < 90:
+            bounds.append(north - lat)
+        if 2 * r + 1 < self.__cols:
+            lon = self.__wrap(lon)
+            west = (col0 - r) * self.cell - 180
+            east = (col0 + r + 1) * self.cell - 180
+            gap = radians(min(lon - west, east - lon, 90))
+            bounds.append(degrees(asin(cos(radians(lat)) * sin(gap))))
+        return min(bounds)
+
+    @staticmethod
+    def __ranked(best):
+        """Return the (distance in km, key) pairs of best, closest first."""
+        best.sort(reverse=True)
+        return [(EARTH_RADIUS_KM * acos(max(-1.0, min(1.0, dot))), key)
+                for dot, key in best]
+
+    def __center(self, level, block):
+        """Return and remember the (x, y, z, side) of a block of the given
+        level, x, y and z being the unit vector of its center.
+
+        No point of a block is farther from its center than half its side
+        along a meridian plus half its side along a parallel, so the side
+        in degrees bounds that distance.
+        """
+        side = self.__sizes[level] * self.cell
+        center = self.__vector((block[0] + 0.5) * side - 90,
+                               (block[1] + 0.5) * side - 180) + (side,)
+        self.__centers[level, block] = center
+        return center
+
+    def __cell(self, lat, lon):
+        """Return the (row, col) cell holding a location."""
+        row = min(int(floor((lat + 90) / self.cell)), self.__rows - 1)
+        col = int(floor((self.__wrap(lon) + 180) / self.cell)) % self.__cols
+        return row, col
+
+    @staticmethod
+    def __wrap(lon):
+        """Return lon brought into [-180, 180)."""
+        return (lon + 180) % 360 - 180
+
+    @staticmethod
+    def __vector(lat, lon):
+        """Return the unit vector of a location."""
+        lat, lon = radians(lat), radians(lon)
+        return cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat)
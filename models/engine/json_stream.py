@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""
+Define helpers to read the JSON object of a storage file one entry at a
+time.
+"""
+import re
+import json
+from json.decoder import scanstring
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def _key(buf, pos):
+    """Decode the JSON string starting at pos in buf."""
+    if not buf.startswith('"', pos):
+        raise json.JSONDecodeError("Expecting property name", buf, pos)
+    return scanstring(buf, pos + 1)
+
+
+class _Reader:
+    """Represent a window over a text file that grows as values need it.
+
+    Attributes:
+        buf (str): The text read but not consumed yet, from index pos.
+        pos (int): Index of the first unconsumed character of buf.
+        eof (bool): Whether the whole file has been read.
+    """
+
+    def __init__(self, f, size):
+        """Initialize a reader of f that reads size characters at once."""
+        self.__f = f
+        self.__size = size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Drop the consumed text and read more; return False at EOF."""
+        chunk = self.__f.read(max(self.__size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip(self):
+        """Skip whitespace, reading more text as needed."""
+        while True:
+            self.pos = _whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def char(self):
+        """Consume and return the next non-whitespace character."""
+        self.skip()
+        if self.pos >= len(self.buf):
+            raise json.JSONDecodeError("Unexpected end of data",
+                                       self.buf, self.pos)
+        self.pos += 1
+        return self.buf[self.pos - 1]
+
+    def parse(self, decode):
+        """Consume and return the value decode() finds at the position.
+
+        A value is only accepted once some text follows it, so that a
+        number cut by the end of the window is never returned.
+        """
+        self.skip()
+        while True:
+            try:
+                value, end = decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_entries(f, size=1 << 16):
+    """Yield the (key, value) pairs of the JSON object read from f.
+
+    Only one value is decoded at a time, so memory stays bounded by the
+    largest entry rather than the whole file.
+
+    Args:
+        f (file): A text file holding a JSON object.
+        size (int): Number of characters to read at once.
+    """
+    reader = _Reader(f, size)
+    if reader.char() != "{":
+        raise json.JSONDecodeError("Expecting '{'", reader.buf, reader.pos)
+    reader.skip()
+    if reader.buf.startswith("}", reader.pos):
+        return
+    while True:
+        key = reader.parse(_key)
+        if reader.char() != ":":
+            raise json.JSONDecodeError("Expecting ':' delimiter",
+                                       reader.buf, reader.pos)
+        yield key, reader.parse(_decoder.raw_decode)
+        c = reader.char()
+        if c == "}":
+            return
+        if c != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter",
+                                       reader.buf, reader.pos)
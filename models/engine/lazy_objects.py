@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Define the LazyObjects class.
+"""
+
+
+class LazyObjects(dict):
+    """Represent the objects of a storage engine that are loaded the
+    first time they are looked up.
+
+    Looking up a single key only loads that object, through the fetch()
+    method of the storage; iterating or sizing the mapping loads every
+    remaining object through its fetch_all() method.
+    """
+
+    def __init__(self, storage):
+        """Initialize an empty mapping backed by storage."""
+        super().__init__()
+        self.__storage = storage
+        self.__complete = False
+
+    def __missing__(self, key):
+        """Load the object stored under key from the storage."""
+        obj = self.__storage.fetch(key)
+        if obj is None:
+            raise KeyError(key)
+        dict.__setitem__(self, key, obj)
+        return obj
+
+    def __contains__(self, key):
+        """Return True if key is loaded or can be loaded."""
+        if dict.__contains__(self, key):
+            return True
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        """Return the object stored under key, or default."""
+        return self[key] if key in self else default
+
+    def reset(self):
+        """Mark the mapping as having objects left to load, after the
+        storage made more of them available."""
+        self.__complete = False
+
+    def load(self):
+        """Load every stored object that is not loaded yet."""
+        if not self.__complete:
+            for key, obj in self.__storage.fetch_all():
+                if not dict.__contains__(self, key):
+                    dict.__setitem__(self, key, obj)
+            self.__complete = True
+
+    def __iter__(self):
+        self.load()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.load()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.load()
+        return dict.keys(self)
+
+    def values(self):
+        self.load()
+        return dict.values(self)
+
+    def items(self):
+        self.load()
+        return dict.items(self)
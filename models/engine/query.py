@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+"""
+Define the Query class.
+"""
+import heapq
+import operator
+from itertools import islice
+from models.engine.indexes import orderable
+
+operators = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+
+
+class Query:
+    """Represent a lazy query over the objects of one model class.
+
+    Every method returns a new Query, and the objects are only looked at
+    when the query is iterated. An equality condition on an attribute in
+    the _indexed tuple of the class is answered by storage.lookup(), and
+    a range of an attribute in its _ranged tuple by storage.between(); the
+    other conditions are checked in a single pass over the result, or
+    over the objects of the class when no index applies. Ordering by a
+    _ranged attribute reads its sorted index, so order_by() and limit()
+    stop after the objects they return.
+
+    Attributes:
+        storage (FileStorage or DBStorage): The storage engine to query.
+        cls (type): The model class, or None if it does not exist.
+        conditions (tuple): The (name, op, value) conditions to meet.
+        order (tuple): The (name, reverse) ordering, or None.
+        count (int): The maximum number of objects, or None.
+    """
+
+    def __init__(self, storage, cls, conditions=(), order=None, count=None):
+        """Initialize a query of the objects of cls in storage."""
+        self.storage = storage
+        self.cls = cls
+        self.conditions = conditions
+        self.order = order
+        self.count = count
+
+    def __copy(self, **changes):
+        """Return a copy of the query with changes applied."""
+        fields = {"conditions": self.conditions, "order": self.order,
+                  "count": self.count}
+        fields.update(changes)
+        return Query(self.storage, self.cls, **fields)
+
+    def where(self, *condition, **equal):
+        """Return the query restricted to the objects meeting a condition.
+
+        Args:
+            *condition: A (name, op, value) condition, op being one of
+                ==, !=, <, <=, > or >=.
+            **equal: name=value conditions.
+        """
+        conditions = list(self.conditions)
+        if condition:
+            name, op, value = condition
+            if op not in operators:
+                raise ValueError("unknown operator {}".format(op))
+            conditions.append((name, op, value))
+        conditions.extend((name, "==", value) for name, value in equal.items())
+        return self.__copy(conditions=tuple(conditions))
+
+    def order_by(self, name, reverse=False):
+        """Return the query ordered by the attribute name."""
+        return self.__copy(order=(name, reverse))
+
+    def limit(self, count):
+        """Return the query stopped after count objects."""
+        return self.__copy(count=count)
+
+    def __iter__(self):
+        """Yield the objects matching the query."""
+        if self.cls is None:
+            return iter(())
+        if self.order is not None:
+            name, reverse = self.order
+            key = self.__sort_key(name, reverse)
+            if name in self.cls._ranged and self.__lookup() is None:
+                objs = self.__ordered(name, reverse)
+            elif self.count is not None:
+                if reverse:
+                    return iter(heapq.nlargest(self.count,
+                                               self.__candidates(), key=key))
+                return iter(heapq.nsmallest(self.count, self.__candidates(),
+                                            key=key))
+            else:
+                return iter(sorted(self.__candidates(), key=key,
+                                   reverse=reverse))
+        else:
+            objs = self.__candidates()
+        if self.count is not None:
+            return islice(objs, self.count)
+        return objs
+
+    def __lookup(self):
+        """Return the first equality condition on an _indexed attribute,
+        or None."""
+        for condition in self.conditions:
+            name, op, value = condition
+            if op == "==" and name in self.cls._indexed:
+                return condition
+        return None
+
+    def __bounds(self, name):
+        """Return the (low, high, include_low, include_high) range that the
+        numeric conditions on name allow, or None if they allow any."""
+        low = high = None
+        include_low = include_high = True
+        for attr, op, value in self.conditions:
+            if attr != name or not orderable(value):
+                continue
+            if op in (">", ">=", "==") and (
+                    low is None or value > low or
+                    value == low and op == ">"):
+                low, include_low = value, op != ">"
+            if op in ("<", "<=", "==") and (
+                    high is None or value < high or
+                    value == high and op == "<"):
+                high, include_high = value, op != "<"
+        if low is None and high is None:
+            return None
+        return low, high, include_low, include_high
+
+    def __candidates(self):
+        """Yield the objects meeting every condition."""
+        checks = list(self.conditions)
+        condition = self.__lookup()
+        objs = None
+        if condition is not None:
+            name, op, value = condition
+            objs = list(self.storage.lookup(self.cls, name, value).values())
+            checks.remove(condition)
+        else:
+            for name in self.cls._ranged:
+                bounds = self.__bounds(name)
+                if bounds is not None:
+                    low, high, include_low, include_high = bounds
+                    objs = self.storage.between(
+                        self.cls, name, low, high, include_low=include_low,
+                        include_high=include_high)
+                    break
+        if objs is None:
+            objs = list(self.storage.all(self.cls).values())
+        checks = [(name, operators[op], value) for name, op, value in checks]
+        for obj in objs:
+            if all(self.__test(obj, name, test, value)
+                   for name, test, value in checks):
+                yield obj
+
+    def __ordered(self, name, reverse):
+        """Yield the objects meeting every condition in the order of the
+        numeric attribute name, read from its sorted index."""
+        checks = [(attr, operators[op], value)
+                  for attr, op, value in self.conditions]
+        bounds = self.__bounds(name) or (None, None, True, True)
+        low, high, include_low, include_high = bounds
+        for obj in self.storage.between(
+                self.cls, name, low, high, include_low=include_low,
+                include_high=include_high, reverse=reverse):
+            if all(self.__test(obj, attr, test, value)
+                   for attr, test, value in checks):
+                yield obj
+        if bounds[:2] != (None, None):
+            return
+        key = self.__sort_key(name, reverse)
+        rest = [obj for obj in self.storage.all(self.cls).values()
+                if not orderable(getattr(obj, name, None)) and
+                all(self.__test(obj, attr, test, value)
+                    for attr, test, value in checks)]
+        yield from sorted(rest, key=key, reverse=reverse)
+
+    @staticmethod
+    def __test(obj, name, test, value):
+        """Return whether the attribute name of obj passes test(value)."""
+        try:
+            return test(getattr(obj, name, None), value)
+        except TypeError:
+            return False
+
+    @staticmethod
+    def __sort_key(name, reverse=False):
+        """Return a sort key on the attribute name that orders numbers
+        first, then strings, then missing and incomparable values, in
+        either direction."""
+        rank = -1 if reverse else 1
+
+        def key(obj):
+            value = getattr(obj, name, None)
+            if orderable(value):
+                return (0, value, "")
+            if isinstance(value, str):
+                return (rank, 0, value)
+            return (2 * rank, 0, "")
+        return key
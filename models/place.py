@@ -1,6 +1,8 @@
 #!/usr/bin/python3
 """Defines the Place class."""
-from models.base_model import BaseModel
+import models
+from models.base_model import BaseModel, ListAttribute
+from models.review import Review
 
 
 class Place(BaseModel):
@@ -11,7 +13,8 @@ class Place(BaseModel):
         latitude(float): Latitude location details.
         longitude(float): Longitude location details.
         city_id(str): City id.
-        amenity_ids(list): List of Amenities available.
+        amenity_ids(list): List of Amenities available, a new one for
+            every place.
         user_id(str): User id.
         name(str): Name of place.
         description(str): Description about the place.
@@ -19,12 +22,13 @@ class Place(BaseModel):
         number_bathrooms(int): No. of bathrooms in the place.
         max_guest(int): Max no. of guests that can be accomodated.
         price_by_night(int): Price per night stay.
+        reviews(list): The reviews of the place, read-only.
     """
 
     latitude = 0.0
     longitude = 0.0
     city_id = ""
-    amenity_ids = []
+    amenity_ids = ListAttribute()
     user_id = ""
     name = ""
     description = ""
@@ -32,3 +36,24 @@ class Place(BaseModel):
     number_rooms = 0
     number_bathrooms = 0
     price_by_night = 0
+
+    _indexed = ("city_id", "user_id")
+    _ranged = ("price_by_night", "max_guest", "number_rooms",
+               "number_bathrooms")
+    _located = ("latitude", "longitude")
+    _searchable = ("name", "description")
+    _tagged = ("amenity_ids",)
+    _numeric = ("price_by_night", "max_guest", "number_rooms",
+                "number_bathrooms", "latitude", "longitude")
+
+    @property
+    def reviews(self):
+        """list: The reviews of the place.
+
+        No list is cached on the place: the bucket of its id in the hash
+        index of Review.place_id is the cache, moved as soon as a review's
+        place_id is assigned, so reading it costs only the reviews found.
+        DBStorage answers with one query on its place_id index instead.
+        """
+        return list(models.storage.lookup(Review, "place_id", self.id)
+                    .values())
@@ -18,3 +18,6 @@ class Review(BaseModel):
     place_id = ""
     user_id = ""
     text = ""
+
+    _indexed = ("place_id", "user_id")
+    _searchable = ("text",)
@@ -2,7 +2,9 @@
 """
 Defines the State class.
 """
+import models
 from models.base_model import BaseModel
+from models.city import City
 
 
 class State(BaseModel):
@@ -11,6 +13,17 @@ class State(BaseModel):
 
     Attributes:
         name (str): The name of the state.
+        cities (list): The cities in the state, read-only.
     """
 
     name = ""
+
+    @property
+    def cities(self):
+        """list: The cities in the state.
+
+        The hash index of City.state_id serves as the cache: storage moves
+        a city between its buckets when state_id changes, so nothing is
+        kept on the state. Under DBStorage this is one indexed query.
+        """
+        return list(models.storage.lookup(City, "state_id", self.id).values())
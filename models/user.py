@@ -2,7 +2,9 @@
 """
 Defines the User class.
 """
+import models
 from models.base_model import BaseModel
+from models.place import Place
 
 
 class User(BaseModel):
@@ -14,9 +16,21 @@ class User(BaseModel):
         last_name (str): User last name.
         email (str): User email.
         password (str): User password.
+        places (list): The places the user owns, read-only.
     """
 
     first_name = ""
     last_name = ""
     email = ""
     password = ""
+
+    @property
+    def places(self):
+        """list: The places the user owns.
+
+        Taken from the Place.user_id hash index bucket of the user's id,
+        which is updated whenever a place's user_id is assigned and is
+        the only cache of this list. Under DBStorage this is one indexed
+        query.
+        """
+        return list(models.storage.lookup(Place, "user_id", self.id).values())
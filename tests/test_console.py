@@ -12,13 +12,21 @@ Unittest classes:
     TestHBNBCommandDestroy
     TestHBNBCommandExit
     TestHBNBCommandShow
+    TestHBNBCommandWhere
+    TestHBNBCommandNear
+    TestHBNBCommandSearch
+    TestHBNBCommandAggregate
+    TestHBNBCommandPlugin
 """
 import os
 import sys
 import unittest
 from console import HBNBCommand
 from models import storage
+from models.base_model import BaseModel, classes
 from models.engine import FileStorage
+from models.place import Place
+from models.review import Review
 from io import StringIO
 from unittest.mock import patch
 
@@ -1516,6 +1524,23 @@ class TestHBNBCommandUpdate(unittest.TestCase):
         test_dict = storage.all()["Place.{}".format(test_Id)].__dict__
         self.assertEqual(9.8, test_dict["latitude"])
 
+    def testUpdateAmenityIDsDotNotation(self):
+        place = Place()
+        test_Cmd = "Place.update({}, amenity_ids, ".format(place.id)
+        test_Cmd += '["wifi", "pool"])'
+        HBNBCommand().onecmd(test_Cmd)
+        self.assertEqual(["wifi", "pool"], place.amenity_ids)
+        self.assertIn("Place." + place.id,
+                      storage.places_having(["pool", "wifi"]))
+
+    def testUpdateReadOnlyAttribute(self):
+        place = Place()
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("Place.update({}, reviews, x)"
+                                 .format(place.id))
+            self.assertEqual("** attribute is read-only **",
+                             output.getvalue().strip())
+
 
 class TestHBNBCommandCount(unittest.TestCase):
     """
@@ -1584,5 +1609,247 @@ class TestHBNBCommandCount(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommandWhere(unittest.TestCase):
+    """
+    Unit tests for testing WHERE option of the cmd interpreter.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage.FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def testWhereErrors(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("MyModel.where(a == 1)"))
+            self.assertEqual("** class doesn't exist **",
+                             output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("Place.where(a ~ 1)"))
+            self.assertEqual("** invalid condition **",
+                             output.getvalue().strip())
+
+    def testWhere(self):
+        small, large = Place(), Place()
+        small.max_guest, large.max_guest = 2, 6
+        large.name = "Big house"
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = "Place.where(max_guest > 4)"
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertIn(large.id, output.getvalue())
+            self.assertNotIn(small.id, output.getvalue())
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = 'Place.where(max_guest >= 2, name == "Big house")'
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertIn(large.id, output.getvalue())
+            self.assertNotIn(small.id, output.getvalue())
+
+    def testWhereQuotedValue(self):
+        place, other = Place(), Place()
+        place.name, other.name = "Loft, river (view)", "Loft"
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = ('Place.where(name == "Loft, river (view)", '
+                       'max_guest < 1)')
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertIn(place.id, output.getvalue())
+            self.assertNotIn(other.id, output.getvalue())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("Place.where(name == 1,)"))
+            self.assertEqual("** invalid condition **",
+                             output.getvalue().strip())
+
+
+class TestHBNBCommandNear(unittest.TestCase):
+    """
+    Unit tests for testing NEAR option of the cmd interpreter.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage.FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def testNearErrors(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("MyModel.near(1, 2, 3)"))
+            self.assertEqual("** class doesn't exist **",
+                             output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("Place.near(north, 2)"))
+            self.assertEqual("** invalid location **",
+                             output.getvalue().strip())
+
+    def testNear(self):
+        places = [Place(), Place(), Place()]
+        for lat, place in zip((-1.29, -4.04, 51.5), places):
+            place.latitude, place.longitude = lat, 36.8
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("Place.near(-1.3, 36.8, 2)"))
+            text = output.getvalue()
+            self.assertLess(text.index(places[0].id), text.index(places[1].id))
+            self.assertNotIn(places[2].id, text)
+
+
+class TestHBNBCommandSearch(unittest.TestCase):
+    """
+    Unit tests for testing SEARCH option of the cmd interpreter.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage.FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        for path in ("file.json", "file.json.search"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def testSearchErrors(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd('MyModel.search("a")'))
+            self.assertEqual("** class doesn't exist **",
+                             output.getvalue().strip())
+
+    def testSearch(self):
+        quiet, noisy = Review(), Review()
+        quiet.text = "Quiet flat with a balcony"
+        noisy.text = "Noisy street"
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = 'Review.search("quiet balcony")'
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertIn(quiet.id, output.getvalue())
+            self.assertNotIn(noisy.id, output.getvalue())
+
+
+class TestHBNBCommandAggregate(unittest.TestCase):
+    """
+    Unit tests for testing the aggregate options of the cmd interpreter.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage.FileStorage._FileStorage__objects = {}
+        for city, price in (("nbo", 100), ("mba", 300), ("nbo", 250)):
+            place = Place()
+            place.city_id, place.price_by_night = city, price
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def output(self, command):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(command))
+            return output.getvalue().strip()
+
+    def testAggregates(self):
+        self.assertEqual("650", self.output("Place.sum(price_by_night)"))
+        self.assertEqual("216.66666666666666",
+                         self.output("Place.avg(price_by_night)"))
+        self.assertEqual("100", self.output('Place.min("price_by_night")'))
+        self.assertEqual("300", self.output("Place.max(price_by_night)"))
+
+    def testGroupBy(self):
+        self.assertEqual("city_id  count()\nmba      1\nnbo      2",
+                         self.output("Place.group_by(city_id).count()"))
+        self.assertEqual("city_id  avg(price_by_night)\nmba      300\n"
+                         "nbo      175",
+                         self.output("Place.group_by(city_id)"
+                                     ".avg(price_by_night)"))
+
+    def testAggregateErrors(self):
+        self.assertEqual("** class doesn't exist **",
+                         self.output("MyModel.sum(price_by_night)"))
+        self.assertEqual("** attribute name missing **",
+                         self.output("Place.avg()"))
+        self.assertEqual("** invalid aggregate **",
+                         self.output("Place.group_by(city_id)"))
+        self.assertEqual("** invalid aggregate **",
+                         self.output("Place.group_by(city_id).median(x)"))
+
+
+class TestHBNBCommandPlugin(unittest.TestCase):
+    """
+    Unit tests for model classes added without editing the interpreter.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage.FileStorage._FileStorage__objects = {}
+
+        class Pool(BaseModel):
+            depth = 0.0
+        self.Pool = Pool
+
+    def tearDown(self):
+        del classes["Pool"]
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def testPluginClass(self):
+        pool = self.Pool()
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("Pool.count()"))
+            self.assertEqual("1", output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = "Pool.show({})".format(pool.id)
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertIn("[Pool] ({})".format(pool.id), output.getvalue())
+        storage.save()
+        storage.reload()
+        self.assertIsInstance(storage.all()["Pool." + pool.id], self.Pool)
+
+
 if __name__ == "__main__":
     unittest.main()
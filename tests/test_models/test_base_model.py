@@ -6,13 +6,19 @@ Unittest classes:
     TestBaseModelInitialization
     TestBaseModelSave
     TestBaseModelToDictionary
+    TestBaseModelCompact
+    TestBaseModelProxy
 """
 import os
+import json
 import models
 import unittest
+import tracemalloc
 from datetime import datetime
 from time import sleep
-from models.base_model import BaseModel
+from unittest.mock import patch
+from models.base_model import BaseModel, classes
+from models.place import Place
 
 
 class TestBaseModelBaseModelInitialization(unittest.TestCase):
@@ -90,6 +96,57 @@ class TestBaseModelBaseModelInitialization(unittest.TestCase):
         self.assertEqual(baseModel.created_at, dateTime)
         self.assertEqual(baseModel.updated_at, dateTime)
 
+    def testInitializationWithWholeSecondKwargs(self):
+        dateTime = datetime(2024, 1, 2, 3, 4, 5)
+        baseModel = BaseModel(created_at=dateTime.isoformat())
+        self.assertEqual(dateTime, baseModel.created_at)
+        self.assertEqual(str, type(baseModel.id))
+        self.assertNotIn(baseModel, models.storage.all().values())
+
+    def testFromDictionary(self):
+        dateTime = datetime.today()
+        dictionary = BaseModel().to_dict()
+        dictionary["name"] = "Holberton"
+        dictionary["updated_at"] = dateTime.isoformat()
+        with patch("models.base_model.uuid4") as uuid4:
+            baseModel = BaseModel.from_dict(dict(dictionary))
+            self.assertFalse(uuid4.called)
+        self.assertEqual(BaseModel, type(baseModel))
+        self.assertEqual(dateTime, baseModel.updated_at)
+        self.assertEqual(dictionary, baseModel.to_dict())
+        self.assertNotIn("__class__", baseModel.__dict__)
+
+    def testTimestampsHeldAsEpochMicroseconds(self):
+        dateTime = datetime(2017, 9, 28, 21, 5, 54, 119427)
+        baseModel = BaseModel()
+        baseModel.created_at = dateTime
+        self.assertEqual(int, type(baseModel.__dict__["created_at"]))
+        self.assertEqual(dateTime, baseModel.created_at)
+        self.assertIn(repr(dateTime), str(baseModel))
+        loaded = BaseModel.from_dict(baseModel.to_dict())
+        self.assertEqual(dateTime, loaded.created_at)
+        self.assertEqual(baseModel.to_dict(), loaded.to_dict())
+
+    def testIdsAreInterned(self):
+        place = Place()
+        place.city_id = "-".join(["city"] * 8)
+        loaded = [Place.from_dict(json.loads(place.to_json()))
+                  for i in range(2)]
+        self.assertIs(loaded[0].id, loaded[1].id)
+        self.assertIs(loaded[0].city_id, loaded[1].city_id)
+        self.assertIs(place.city_id, loaded[0].city_id)
+        self.assertIn("city_id", Place._ids)
+
+    def testSubclassesAreRegistered(self):
+        self.assertIs(BaseModel, classes["BaseModel"])
+        for name in ("User", "State", "City", "Place", "Amenity", "Review"):
+            self.assertIn(name, classes)
+
+        class Pool(BaseModel):
+            pass
+        self.assertIs(Pool, classes["Pool"])
+        del classes["Pool"]
+
 
 class TestBaseModelSave(unittest.TestCase):
     """
@@ -196,6 +253,140 @@ class TestBaseModelToDictionary(unittest.TestCase):
         with self.assertRaises(TypeError):
             baseModel.to_dict(None)
 
+    def testToJsonMatchesToDictionary(self):
+        baseModel = BaseModel()
+        self.assertEqual(baseModel.to_dict(), json.loads(baseModel.to_json()))
+
+    def testToJsonIsCachedUntilAttributeSet(self):
+        baseModel = BaseModel()
+        first = baseModel.to_json()
+        self.assertIs(first, baseModel.to_json())
+        baseModel.name = "Holberton"
+        self.assertIsNot(first, baseModel.to_json())
+        self.assertIn('"name":"Holberton"', baseModel.to_json())
+
+    def testToDictionaryIsCachedUntilAttributeSet(self):
+        baseModel = BaseModel()
+        first = baseModel.to_dict()
+        first["name"] = "changed"
+        cached = baseModel._dict
+        self.assertNotIn("name", baseModel.to_dict())
+        self.assertIs(cached, baseModel._dict)
+        baseModel.name = "Holberton"
+        self.assertEqual("Holberton", baseModel.to_dict()["name"])
+
+    def testAssignmentDuringSerializationIsNotLost(self):
+        baseModel = BaseModel()
+        attributes = BaseModel._attributes
+
+        def racing(obj):
+            found = attributes(obj)
+            obj.name = "Holberton"
+            return found
+        with patch.object(BaseModel, "_attributes", racing):
+            self.assertNotIn("Holberton", baseModel.to_json())
+        self.assertIsNone(baseModel._json)
+        self.assertIn('"name":"Holberton"', baseModel.to_json())
+        self.assertIn("'name': 'Holberton'", str(baseModel))
+
+    def testStringIsCachedUntilAttributeSet(self):
+        baseModel = BaseModel()
+        first = str(baseModel)
+        self.assertIs(first, str(baseModel))
+        baseModel.name = "Holberton"
+        self.assertIn("'name': 'Holberton'", str(baseModel))
+
+
+class TestBaseModelCompact(unittest.TestCase):
+    """
+    Unit testing the compact variants of the model classes.
+    """
+
+    def setUp(self):
+        self.place = Place()
+        self.place.name = "Holberton"
+        self.place.amenity_ids.append("wifi")
+        self.place.rating = 4.5
+        self.compact = Place.compact().from_dict(self.place.to_dict())
+
+    def testCompactVariant(self):
+        variant = Place.compact()
+        self.assertIs(variant, Place.compact())
+        self.assertIs(variant, variant.compact())
+        self.assertTrue(issubclass(variant, Place))
+        self.assertEqual("Place", variant.__name__)
+        self.assertIs(Place, classes["Place"])
+        self.assertIsInstance(self.compact, Place)
+
+    def testCompactMatchesModel(self):
+        self.assertEqual(self.place.to_dict(), self.compact.to_dict())
+        self.assertEqual(self.place.to_json(), self.compact.to_json())
+        self.assertEqual(str(self.place), str(self.compact))
+        self.assertEqual(0, self.compact.max_guest)
+        self.assertEqual(self.place.created_at, self.compact.created_at)
+        self.assertEqual(4.5, self.compact.rating)
+        self.assertEqual({"rating": 4.5}, self.compact._extra)
+        self.assertFalse(hasattr(self.compact, "missing"))
+        for name in ("_json", "_dict", "_str"):
+            self.assertIsNone(getattr(self.compact, name))
+
+    def testCompactAttributesSet(self):
+        self.compact.max_guest = 3
+        self.compact.size = "large"
+        self.place.max_guest = 3
+        self.place.size = "large"
+        self.assertEqual(str(self.place), str(self.compact))
+        self.assertEqual([], Place.compact()().amenity_ids)
+        with self.assertRaises(AttributeError):
+            self.compact.reviews = []
+
+    def testCompactUsesLessMemory(self):
+        place = Place()
+        place.name, place.price_by_night, place.city_id = "Loft", 90, "c"
+        texts = [place.to_json()] * 1000
+        sizes = []
+        for cls in (Place, Place.compact()):
+            tracemalloc.start()
+            objs = [cls.from_dict(json.loads(text)) for text in texts]
+            sizes.append(tracemalloc.get_traced_memory()[0] / len(objs))
+            tracemalloc.stop()
+        self.assertLess(sizes[1], sizes[0] * 0.8)
+
+
+class TestBaseModelProxy(unittest.TestCase):
+    """
+    Unit testing the proxy variants of the model classes.
+    """
+
+    def setUp(self):
+        self.place = Place()
+        self.place.name = "Holberton"
+        self.text = self.place.to_json().replace(",", ", ")
+
+    def testProxyVariant(self):
+        variant = Place.proxy()
+        self.assertIs(variant, Place.proxy())
+        self.assertTrue(issubclass(variant, Place))
+        self.assertEqual("Place", variant.__name__)
+        self.assertIs(Place, classes["Place"])
+
+    def testProxyKeepsText(self):
+        proxy = Place.proxy().from_json(self.text)
+        self.assertIs(self.text, proxy.to_json())
+        self.assertIs(Place.proxy(), type(proxy))
+        self.assertEqual({}, object.__getattribute__(proxy, "__dict__"))
+
+    def testProxyBuiltOnFirstUse(self):
+        proxy = Place.proxy().from_json(self.text)
+        self.assertEqual("Holberton", proxy.name)
+        self.assertIs(Place, type(proxy))
+        self.assertEqual(self.place.to_dict(), proxy.to_dict())
+        self.assertIs(self.text, proxy.to_json())
+        proxy = Place.compact().proxy().from_json(self.text)
+        proxy.max_guest = 4
+        self.assertIs(Place.compact(), type(proxy))
+        self.assertIn('"max_guest":4', proxy.to_json())
+
 
 if __name__ == "__main__":
     unittest.main()
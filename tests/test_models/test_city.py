@@ -13,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.city import City
+from models.place import Place
 
 
 class TestCityInitialization(unittest.TestCase):
@@ -92,6 +93,22 @@ class TestCityInitialization(unittest.TestCase):
         with self.assertRaises(TypeError):
             City(id=None, created_at=None, updated_at=None)
 
+    def testPlacesFollowsForeignKey(self):
+        city = City()
+        places = [Place(), Place()]
+        places[0].city_id = city.id
+        self.assertEqual([places[0]], city.places)
+        places[1].city_id = city.id
+        self.assertCountEqual(places, city.places)
+        places[0].city_id = ""
+        self.assertEqual([places[1]], city.places)
+        models.storage.delete(places[1])
+        self.assertEqual([], city.places)
+
+    def testPlacesIsReadOnly(self):
+        with self.assertRaises(AttributeError):
+            City().places = []
+
 
 class TestCitySave(unittest.TestCase):
     """
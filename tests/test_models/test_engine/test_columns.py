@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""
+Defines unit tests for models/engine/columns.py.
+
+Unittest classes:
+    TestAggregate
+    TestColumns
+"""
+
+import unittest
+from array import array
+from types import SimpleNamespace
+from models.engine.columns import Columns, aggregate
+
+
+class TestAggregate(unittest.TestCase):
+    """
+    Unit testing the aggregate function.
+    """
+
+    def setUp(self):
+        self.values = array("d", [4.0, 1.0, 3.0, 2.0])
+
+    def testAggregates(self):
+        self.assertEqual(4, aggregate("count", self.values))
+        self.assertEqual(10.0, aggregate("sum", self.values))
+        self.assertEqual(2.5, aggregate("avg", self.values))
+        self.assertEqual(1.0, aggregate("min", self.values))
+        self.assertEqual(4.0, aggregate("max", self.values))
+
+    def testPercentile(self):
+        self.assertEqual(2.5, aggregate("percentile", self.values, 50))
+        self.assertEqual(1.0, aggregate("percentile", self.values, 0))
+        self.assertEqual(3.7, round(aggregate("percentile", self.values,
+                                              90), 6))
+        with self.assertRaises(ValueError):
+            aggregate("percentile", self.values, 101)
+
+    def testHistogram(self):
+        self.assertEqual(([2, 2], [1.0, 2.5, 4.0]),
+                         aggregate("histogram", self.values, 2))
+        self.assertEqual(([1], [1.5, 2.5]),
+                         aggregate("histogram", array("d", [2.0]), 1))
+
+    def testEmpty(self):
+        empty = array("d")
+        self.assertEqual(0, aggregate("count", empty))
+        self.assertEqual(0.0, aggregate("sum", empty))
+        self.assertIsNone(aggregate("avg", empty))
+        self.assertIsNone(aggregate("percentile", empty, 50))
+
+    def testUnknownAggregate(self):
+        with self.assertRaises(ValueError):
+            aggregate("median", self.values)
+
+
+class TestColumns(unittest.TestCase):
+    """
+    Unit testing the Columns class.
+    """
+
+    def testAddAndDiscard(self):
+        columns = Columns(("price", "rooms"))
+        for key, price in (("a", 10), ("b", "free"), ("c", 30), ("d", 40)):
+            columns.add(key, SimpleNamespace(price=price, rooms=1))
+        self.assertEqual(1, columns.missing["price"])
+        self.assertEqual(80.0, columns.aggregate("sum", "price"))
+        columns.discard("a")
+        columns.discard("b")
+        columns.discard("missing")
+        self.assertEqual(0, columns.missing["price"])
+        self.assertEqual(["d", "c"], columns.keys)
+        self.assertEqual(array("d", [40.0, 30.0]), columns.columns["price"])
+        columns.add("c", SimpleNamespace(price=None, rooms=2))
+        self.assertEqual(40.0, columns.aggregate("max", "price"))
+        self.assertEqual(3.0, columns.aggregate("sum", "rooms"))
+        self.assertEqual(2.0, columns.aggregate("sum", "rooms", keys=["c"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
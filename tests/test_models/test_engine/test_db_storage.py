@@ -0,0 +1,290 @@
+#!/usr/bin/python3
+"""
+Defines unit tests for models/engine/db_storage.py.
+
+Unittest classes:
+    TestDBStorageInitialization
+    TestDBStorageMethods
+"""
+
+import os
+import sqlite3
+import unittest
+from unittest.mock import patch
+from models.base_model import BaseModel, classes
+from models.engine.db_storage import DBStorage
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+class TestDBStorageInitialization(unittest.TestCase):
+    """
+    Unit testing Initialization of the DBStorage class.
+    """
+
+    def testDBStorageInitializationWithArgs(self):
+        with self.assertRaises(TypeError):
+            DBStorage(None)
+
+    def testDBStorageDBPathIsPrivateString(self):
+        self.assertEqual(str, type(DBStorage._DBStorage__db_path))
+
+
+class TestDBStorageMethods(unittest.TestCase):
+    """
+    Unit testing methods of the DBStorage class.
+    """
+
+    def setUp(self):
+        self.path = DBStorage._DBStorage__db_path
+        DBStorage._DBStorage__db_path = "test_hbnb.db"
+        self.storage = DBStorage()
+        self.storage.reload()
+
+    def tearDown(self):
+        self.storage.close()
+        DBStorage._DBStorage__db_path = self.path
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove("test_hbnb.db" + suffix)
+            except IOError:
+                pass
+
+    def testReloadUsesWAL(self):
+        db = sqlite3.connect("test_hbnb.db")
+        self.assertEqual("wal", db.execute("PRAGMA journal_mode")
+                         .fetchone()[0])
+        db.close()
+
+    def testNewAndAll(self):
+        user = User()
+        self.storage.new(user)
+        self.assertIn("User." + user.id, self.storage.all())
+        self.assertIs(user, self.storage.all()["User." + user.id])
+
+    def testSaveAndReload(self):
+        user = User()
+        user.first_name = "Betty"
+        state = State()
+        self.storage.new(user)
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(0, dict.__len__(self.storage.all()))
+        loaded = self.storage.all()["User." + user.id]
+        self.assertIsNot(user, loaded)
+        self.assertEqual(user.to_dict(), loaded.to_dict())
+        self.assertEqual(1, dict.__len__(self.storage.all()))
+        self.assertEqual(2, len(self.storage.all()))
+
+    def testTouchSavesChanges(self):
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        user.first_name = "Betty"
+        self.storage.touch(user)
+        self.storage.save()
+        self.storage.reload()
+        loaded = self.storage.all()["User." + user.id]
+        self.assertEqual("Betty", loaded.first_name)
+
+    def testFailedSaveKeepsChanges(self):
+        user = User()
+        self.storage.new(user)
+        with patch.object(DBStorage, "_DBStorage__apply",
+                          side_effect=sqlite3.OperationalError("locked")):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.storage.save()
+        self.storage.save()
+        self.storage.reload()
+        self.assertIn("User." + user.id, self.storage.all())
+
+    def testDelete(self):
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        self.storage.delete(user)
+        self.assertNotIn("User." + user.id, self.storage.all())
+        self.storage.save()
+        self.storage.reload()
+        self.assertNotIn("User." + user.id, self.storage.all())
+
+    def testAllWithClassAndCount(self):
+        user = User()
+        state = State()
+        self.storage.new(user)
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(["User." + user.id], list(self.storage.all(User)))
+        self.assertEqual(1, self.storage.count("User"))
+        self.assertEqual(2, self.storage.count())
+        self.storage.new(User())
+        self.storage.delete(self.storage.all()["State." + state.id])
+        self.assertEqual(2, self.storage.count(User))
+        self.assertEqual(0, self.storage.count(State))
+        self.assertEqual({}, self.storage.all("MyModel"))
+
+    def testLookup(self):
+        state = State()
+        cities = [City(), City()]
+        cities[0].state_id = state.id
+        for city in cities:
+            self.storage.new(city)
+        self.storage.save()
+        self.storage.reload()
+        found = self.storage.lookup(City, "state_id", state.id)
+        self.assertEqual(["City." + cities[0].id], list(found))
+        city = self.storage.all()["City." + cities[1].id]
+        city.state_id = state.id
+        self.storage.touch(city, "state_id")
+        found = self.storage.lookup("City", "state_id", state.id)
+        self.assertEqual({"City." + c.id for c in cities}, set(found))
+
+    def testTouchIgnoresDetachedCopy(self):
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        copy = User(**user.to_dict())
+        copy.first_name = "Betty"
+        self.storage.touch(copy)
+        self.assertEqual(set(), DBStorage._DBStorage__pending)
+
+    def testLookupUsesIndex(self):
+        db = sqlite3.connect("test_hbnb.db")
+        plan = db.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM \"City\" WHERE "
+            "json_extract(data, '$.state_id') = 'x'").fetchall()
+        db.close()
+        self.assertIn("City_state_id", str(plan))
+
+    def testBetween(self):
+        places = [Place() for price in range(4)]
+        for price, place in zip((300, 100, 400, 200), places):
+            place.price_by_night = price
+            self.storage.new(place)
+        self.storage.new(Place())
+        self.storage.save()
+        self.storage.reload()
+        place = self.storage.all()["Place." + places[0].id]
+        place.price_by_night = 250
+        self.storage.touch(place, "price_by_night")
+        found = self.storage.between(Place, "price_by_night", 200)
+        self.assertEqual([200, 250, 400],
+                         [p.price_by_night for p in found])
+        found = self.storage.between("Place", "price_by_night", high=200,
+                                     include_high=False, reverse=True)
+        self.assertEqual([100, 0], [p.price_by_night for p in found])
+
+    def testBetweenUsesIndex(self):
+        db = sqlite3.connect("test_hbnb.db")
+        plan = db.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM \"Place\" ORDER BY "
+            "coalesce(json_extract(data, '$.max_guest'), 0)").fetchall()
+        db.close()
+        self.assertIn("Place_max_guest_order", str(plan))
+
+    def testNearAndWithin(self):
+        places = [Place(), Place(), Place()]
+        for lat, place in zip((-1.29, -4.04, 51.5), places):
+            place.latitude, place.longitude = lat, 36.8
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.reload()
+        found = self.storage.places_near(-1.3, 36.8, 2)
+        self.assertEqual([places[0].id, places[1].id], [p.id for p in found])
+        found = self.storage.near(Place, 60, 36.8, 1)
+        self.assertEqual([places[2].id], [p.id for p in found])
+        found = self.storage.within("Place", -5, 30, 0, 40)
+        self.assertEqual({places[0].id, places[1].id}, {p.id for p in found})
+        self.assertEqual([], self.storage.near(User, 0, 0))
+
+    def testSearch(self):
+        reviews = [Review(), Review()]
+        reviews[0].text = "Quiet flat with a sunny balcony"
+        reviews[1].text = "Noisy street, but the balcony is nice"
+        for review in reviews:
+            self.storage.new(review)
+        found = self.storage.search(Review, "quiet balcony")
+        self.assertEqual([r.id for r in reviews], [r.id for r in found])
+        self.storage.save()
+        self.storage.reload()
+        review = self.storage.all()["Review." + reviews[1].id]
+        review.text = "Quiet at night"
+        self.storage.touch(review)
+        found = self.storage.search("Review", "quiet", 1)
+        self.assertEqual(1, len(found))
+        self.assertEqual({r.id for r in reviews},
+                         {r.id for r in self.storage.search(Review, "quiet")})
+        self.storage.delete(review)
+        self.storage.save()
+        self.assertEqual([reviews[0].id],
+                         [r.id for r in self.storage.search(Review, "quiet")])
+        self.assertEqual([], self.storage.search(User, "quiet"))
+
+    def testHaving(self):
+        places = [Place(), Place(), Place()]
+        for ids, place in zip((["wifi", "pool"], ["wifi"], []), places):
+            place.amenity_ids = ids
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.reload()
+        found = self.storage.places_having(["pool", "wifi"])
+        self.assertEqual(["Place." + places[0].id], list(found))
+        place = self.storage.all()["Place." + places[2].id]
+        place.amenity_ids = ["wifi"]
+        self.storage.touch(place, "amenity_ids")
+        found = self.storage.having("Place", "amenity_ids", ["wifi"])
+        self.assertEqual({"Place." + p.id for p in places}, set(found))
+        self.assertEqual({}, self.storage.having(Place, "amenity_ids",
+                                                 ["gym"]))
+
+    def testAggregate(self):
+        places = [Place() for i in range(4)]
+        for price, city, place in zip((100, 300, 200, "ask"),
+                                      ("a", "b", "a", "a"), places):
+            place.price_by_night, place.city_id = price, city
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.reload()
+        place = Place()
+        place.price_by_night = 400
+        self.storage.new(place)
+        self.assertEqual(4, self.storage.aggregate(Place, "count",
+                                                   "price_by_night"))
+        self.assertEqual(250.0, self.storage.aggregate(
+            "Place", "avg", "price_by_night"))
+        self.assertEqual(175.0, self.storage.aggregate(
+            Place, "percentile", "price_by_night", 25))
+        self.assertEqual({"a": 300.0, "b": 300.0, "": 400.0},
+                         self.storage.aggregate(Place, "sum",
+                                                "price_by_night",
+                                                group_by="city_id"))
+        self.assertIsNone(self.storage.aggregate(User, "max", "age"))
+        self.assertEqual({"a": 3, "b": 1, "": 1},
+                         self.storage.count(Place, group_by="city_id"))
+
+    def testPluginClass(self):
+        class Pool(BaseModel):
+            pass
+        try:
+            pool = Pool()
+            self.storage.new(pool)
+            self.storage.save()
+            self.storage.reload()
+            self.assertEqual(["Pool." + pool.id], list(self.storage.all(Pool)))
+        finally:
+            del classes["Pool"]
+
+    def testMissingKey(self):
+        self.assertNotIn("User.missing", self.storage.all())
+        self.assertIsNone(self.storage.all().get("Nope.missing"))
+        with self.assertRaises(KeyError):
+            self.storage.all()["User.missing"]
+
+
+if __name__ == "__main__":
+    unittest.main()
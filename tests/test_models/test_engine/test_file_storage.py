@@ -5,15 +5,33 @@ Defines unit tests for models/engine/file_storage.py.
 Unittest classes:
     TestFileStorageInitialization
     TestFileStorageMethods
+    TestFileStorageJournal
+    TestFileStorageCommit
+    TestFileStorageWriteBehind
+    TestFileStoragePartitions
+    TestFileStorageLazy
+    TestFileStorageLookup
+    TestFileStorageQuery
+    TestFileStorageRanges
+    TestFileStorageGeo
+    TestFileStorageSearch
+    TestFileStorageAmenities
+    TestFileStorageAggregates
+    TestFileStorageCompact
 """
 
 import os
 import json
+import math
 import models
+import threading
 import unittest
+from time import sleep
+from unittest.mock import patch
 from datetime import datetime
 from models.base_model import BaseModel
 from models.engine.FileStorage import FileStorage
+from models.engine.indexes import TextIndex
 from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
@@ -71,9 +89,34 @@ class TestFileStorageMethods(unittest.TestCase):
     def testAll(self):
         self.assertEqual(dict, type(models.storage.all()))
 
-    def testAllWithArg(self):
-        with self.assertRaises(TypeError):
-            models.storage.all(None)
+    def testAllWithClass(self):
+        user = User()
+        State()
+        self.assertEqual({"User." + user.id: user}, models.storage.all(User))
+        self.assertEqual({"User." + user.id: user},
+                         models.storage.all("User"))
+        self.assertEqual({}, models.storage.all("MyModel"))
+        self.assertIs(models.storage.all(), models.storage.all(None))
+
+    def testCount(self):
+        user = User()
+        State()
+        State()
+        self.assertEqual(1, models.storage.count(User))
+        self.assertEqual(2, models.storage.count("State"))
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(0, models.storage.count("MyModel"))
+        models.storage.delete(user)
+        self.assertEqual(0, models.storage.count(User))
+
+    def testCountAfterReload(self):
+        User()
+        State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(1, models.storage.count("User"))
+        self.assertEqual(2, models.storage.count())
 
     def testNew(self):
         baseModel = BaseModel()
@@ -171,6 +214,1073 @@ class TestFileStorageMethods(unittest.TestCase):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
+    def testSaveReusesCleanObjects(self):
+        user = User()
+        state = State()
+        models.storage.save()
+        cached = state.to_json()
+        user.first_name = "Betty"
+        models.storage.save()
+        self.assertIs(cached, state.to_json())
+        with open("file.json", "r") as f:
+            objs = json.load(f)
+        self.assertEqual("Betty", objs["User." + user.id]["first_name"])
+
+    def testSaveWritesOneCompactEntryPerLine(self):
+        user = User()
+        state = State()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            lines = f.read().splitlines()
+        self.assertEqual("{", lines[0])
+        self.assertEqual("}", lines[-1])
+        self.assertEqual(len(models.storage.all()), len(lines) - 2)
+        prefix = '"User.{}":{{'.format(user.id)
+        self.assertTrue(any(line.startswith(prefix) for line in lines))
+        with open("file.json", "r") as f:
+            self.assertEqual(state.to_dict(),
+                             json.load(f)["State." + state.id])
+
+    def testDelete(self):
+        user = User()
+        models.storage.delete(user)
+        self.assertNotIn("User." + user.id, models.storage.all())
+        models.storage.delete(None)
+
+
+class TestFileStorageJournal(unittest.TestCase):
+    """
+    Unit testing the journal mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__journal = False
+        for path in ("file.json", "file.json.log"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testSaveAppendsToLog(self):
+        user = User()
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json"))
+        with open("file.json.log", "r") as f:
+            self.assertEqual(1, len(f.readlines()))
+        user.first_name = "Betty"
+        user.save()
+        with open("file.json.log", "r") as f:
+            self.assertEqual(2, len(f.readlines()))
+
+    def testReloadReplaysLog(self):
+        user = User()
+        state = State()
+        models.storage.save()
+        user.first_name = "Betty"
+        user.save()
+        models.storage.delete(state)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = FileStorage._FileStorage__objects
+        self.assertEqual("Betty", objs["User." + user.id].first_name)
+        self.assertNotIn("State." + state.id, objs)
+
+    def testReloadIgnoresTornRecord(self):
+        user = User()
+        models.storage.save()
+        with open("file.json.log", "a") as f:
+            f.write('{"op": "put", "key": "User.1", "val')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(["User." + user.id], list(models.storage.all()))
+        with open("file.json.log", "r") as f:
+            self.assertEqual(1, len(f.readlines()))
+
+    def testCompactFoldsLogIntoFile(self):
+        user = User()
+        models.storage.save()
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.log"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + user.id, models.storage.all())
+
+
+class TestFileStorageCommit(unittest.TestCase):
+    """
+    Unit testing atomic snapshot writes and group commit.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__commit_window = 0
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testFailedSaveKeepsPreviousFile(self):
+        user = User()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            before = f.read()
+        State()
+        with patch.object(State, "to_json", side_effect=OSError):
+            with self.assertRaises(OSError):
+                models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(before, f.read())
+        self.assertEqual([], [p for p in os.listdir(".")
+                              if p.startswith(".file.json")])
+
+    def testConcurrentSavesShareOneWrite(self):
+        FileStorage._FileStorage__commit_window = 0.05
+        users = [User() for i in range(8)]
+        real_compact = FileStorage.compact
+        with patch.object(FileStorage, "compact", autospec=True,
+                          side_effect=real_compact) as compact:
+            threads = [threading.Thread(target=models.storage.save)
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLess(compact.call_count, 8)
+        with open("file.json", "r") as f:
+            objs = json.load(f)
+        for user in users:
+            self.assertIn("User." + user.id, objs)
+
+
+class TestFileStorageWriteBehind(unittest.TestCase):
+    """
+    Unit testing the write-behind mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__flush_interval = 0.1
+        FileStorage._FileStorage__flush_changes = 1000
+
+    def tearDown(self):
+        FileStorage._FileStorage__flush_interval = 0
+        models.storage.flush()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testSaveIsDeferred(self):
+        User()
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json"))
+
+    def testFlushWritesImmediately(self):
+        user = User()
+        models.storage.save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertIn("User." + user.id, f.read())
+
+    def testBackgroundFlushAfterInterval(self):
+        user = User()
+        models.storage.save()
+        for i in range(40):
+            if os.path.exists("file.json"):
+                break
+            sleep(0.05)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + user.id, f.read())
+
+    def testBackgroundFlushAfterChanges(self):
+        FileStorage._FileStorage__flush_interval = 1
+        FileStorage._FileStorage__flush_changes = 3
+        for i in range(3):
+            User().save()
+        sleep(0.3)
+        self.assertTrue(os.path.exists("file.json"))
+
+    def testConcurrentChangesAreJournaled(self):
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__flush_interval = 0.001
+        FileStorage._FileStorage__flush_changes = 1
+        try:
+            def create():
+                for i in range(300):
+                    User().save()
+            threads = [threading.Thread(target=create) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            models.storage.flush()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            self.assertEqual(1200, models.storage.count(User))
+        finally:
+            FileStorage._FileStorage__journal = False
+            try:
+                os.remove("file.json.log")
+            except IOError:
+                pass
+
+    def testBackgroundErrorIsRaisedBySave(self):
+        with patch.object(FileStorage, "_FileStorage__write",
+                          side_effect=OSError("disk full")):
+            User().save()
+            sleep(0.3)
+            with self.assertRaises(OSError):
+                User().save()
+        User().save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertEqual(3, len(json.load(f)))
+
+
+class TestFileStoragePartitions(unittest.TestCase):
+    """
+    Unit testing the partitioned mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__partitioned = True
+        FileStorage._FileStorage__file_path = "test_file.json"
+
+    def tearDown(self):
+        FileStorage._FileStorage__partitioned = False
+        FileStorage._FileStorage__file_path = "file.json"
+        for name in os.listdir("."):
+            if name.startswith("test_file."):
+                os.remove(name)
+        FileStorage._FileStorage__objects = {}
+
+    def testSaveWritesOneFilePerClass(self):
+        user = User()
+        state = State()
+        models.storage.save()
+        self.assertFalse(os.path.exists("test_file.json"))
+        with open("test_file.User.json", "r") as f:
+            self.assertEqual(["User." + user.id], list(json.load(f)))
+        with open("test_file.State.json", "r") as f:
+            self.assertEqual(["State." + state.id], list(json.load(f)))
+
+    def testSaveOnlyRewritesChangedPartitions(self):
+        user = User()
+        State()
+        models.storage.save()
+        os.remove("test_file.State.json")
+        user.first_name = "Betty"
+        models.storage.save()
+        self.assertTrue(os.path.exists("test_file.User.json"))
+        self.assertFalse(os.path.exists("test_file.State.json"))
+
+    def testDeleteRewritesPartition(self):
+        user = User()
+        models.storage.save()
+        models.storage.delete(user)
+        models.storage.save()
+        with open("test_file.User.json", "r") as f:
+            self.assertEqual({}, json.load(f))
+
+    def testReloadSelectedClasses(self):
+        user = User()
+        state = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload(classes=["State"])
+        self.assertEqual(["State." + state.id], list(models.storage.all()))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + user.id, models.storage.all())
+        self.assertIn("State." + state.id, models.storage.all())
+
+    def testSaveKeepsSkippedPartitions(self):
+        users = [User(), User()]
+        state = State()
+        gone = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload(classes=["User"])
+        new = State()
+        models.storage.delete(gone)
+        models.storage.save()
+        with open("test_file.State.json", "r") as f:
+            self.assertEqual({"State." + state.id, "State." + new.id},
+                             set(json.load(f)))
+        with open("test_file.User.json", "r") as f:
+            self.assertEqual({"User." + u.id for u in users},
+                             set(json.load(f)))
+
+
+class TestFileStorageLazy(unittest.TestCase):
+    """
+    Unit testing the lazy reload mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.state = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testReloadBuildsNothing(self):
+        objs = models.storage.all()
+        self.assertEqual(0, dict.__len__(objs))
+        self.assertEqual(2, len(FileStorage._FileStorage__index))
+
+    def testCountBuildsNothing(self):
+        self.assertEqual(1, models.storage.count(User))
+        self.assertEqual(0, dict.__len__(models.storage.all()))
+        self.assertEqual(["User." + self.user.id],
+                         list(models.storage.all(User)))
+        self.assertEqual(1, dict.__len__(models.storage.all()))
+
+    def testLookupBuildsOneObject(self):
+        objs = models.storage.all()
+        self.assertIn("User." + self.user.id, objs)
+        user = objs["User." + self.user.id]
+        self.assertEqual(User.proxy(), type(user))
+        self.assertEqual(self.user.to_dict(), user.to_dict())
+        self.assertEqual(User, type(user))
+        self.assertEqual(1, dict.__len__(objs))
+        self.assertIs(user, objs["User." + self.user.id])
+
+    def testIterationDecodesNothing(self):
+        objs = models.storage.all()
+        self.assertEqual({User.proxy(), State.proxy()},
+                         {type(obj) for obj in objs.values()})
+        user = objs["User." + self.user.id]
+        self.assertEqual("Betty", user.first_name)
+        self.assertEqual(User, type(user))
+        self.assertIs(State.proxy(), type(objs["State." + self.state.id]))
+
+    def testSaveWritesProxiesVerbatim(self):
+        with open("file.json") as f:
+            text = f.read().replace('"first_name":"Betty"',
+                                    '"first_name": "Betty"')
+        with open("file.json", "w") as f:
+            f.write(text)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(2, len(objs))
+        models.storage.save()
+        with open("file.json") as f:
+            self.assertIn('"first_name": "Betty"', f.read())
+        self.assertEqual(User.proxy(), type(objs["User." + self.user.id]))
+
+    def testIterationBuildsEverything(self):
+        objs = models.storage.all()
+        self.assertEqual(2, len(objs))
+        self.assertEqual({"User." + self.user.id, "State." + self.state.id},
+                         {key for key in objs})
+
+    def testSaveKeepsUnbuiltObjects(self):
+        user = models.storage.all()["User." + self.user.id]
+        user.last_name = "Holberton"
+        models.storage.save()
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual("Holberton", objs["User." + self.user.id].last_name)
+        self.assertIn("State." + self.state.id, objs)
+
+    def testSecondReloadLoadsEverything(self):
+        self.assertEqual(2, len(models.storage.all()))
+        User()
+        models.storage.save()
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(3, len(objs))
+        self.assertEqual(3, len(list(objs.values())))
+
+    def testJournalSaveBuildsNothing(self):
+        FileStorage._FileStorage__journal = True
+        try:
+            user = models.storage.all()["User." + self.user.id]
+            user.last_name = "Holberton"
+            models.storage.save()
+            self.assertEqual(1, dict.__len__(models.storage.all()))
+        finally:
+            FileStorage._FileStorage__journal = False
+            FileStorage._FileStorage__log_size = 0
+            try:
+                os.remove("file.json.log")
+            except IOError:
+                pass
+
+    def testDeleteUnbuiltObject(self):
+        models.storage.delete(self.state)
+        self.assertNotIn("State." + self.state.id, models.storage.all())
+
+
+class TestFileStorageLookup(unittest.TestCase):
+    """
+    Unit testing attribute lookups of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.state = State()
+        self.cities = [City(), City(), City()]
+        for city in self.cities[:2]:
+            city.state_id = self.state.id
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def keys(self, objs):
+        return {"{}.{}".format(type(obj).__name__, obj.id) for obj in objs}
+
+    def testDetachedCopyIsNotIndexed(self):
+        models.storage.lookup(City, "state_id", self.state.id)
+        copy = City(**self.cities[0].to_dict())
+        copy.state_id = "other"
+        self.assertEqual({}, models.storage.lookup(City, "state_id",
+                                                   "other"))
+        self.assertEqual(self.keys(self.cities[:2]),
+                         set(models.storage.lookup(City, "state_id",
+                                                   self.state.id)))
+        self.assertIn(self.cities[0], self.state.cities)
+
+    def testLookupIndexedAttribute(self):
+        found = models.storage.lookup(City, "state_id", self.state.id)
+        self.assertEqual(self.keys(self.cities[:2]), set(found))
+        self.assertEqual({}, models.storage.lookup("City", "state_id", "x"))
+        indexes = FileStorage._FileStorage__attr_indexes
+        self.assertIn("state_id", indexes["City"])
+
+    def testLookupFollowsUpdates(self):
+        models.storage.lookup(City, "state_id", self.state.id)
+        self.cities[0].state_id = "other"
+        self.cities[2].state_id = self.state.id
+        city = City()
+        city.state_id = self.state.id
+        models.storage.delete(self.cities[1])
+        found = models.storage.lookup(City, "state_id", self.state.id)
+        self.assertEqual(self.keys([self.cities[2], city]), set(found))
+        found = models.storage.lookup(City, "state_id", "other")
+        self.assertEqual(self.keys([self.cities[0]]), set(found))
+
+    def testLookupAfterReload(self):
+        models.storage.lookup(City, "state_id", self.state.id)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        found = models.storage.lookup(City, "state_id", self.state.id)
+        self.assertEqual(self.keys(self.cities[:2]), set(found))
+
+    def testLookupUnindexedAttribute(self):
+        self.cities[1].name = "Nairobi"
+        found = models.storage.lookup("City", "name", "Nairobi")
+        self.assertEqual(self.keys(self.cities[1:2]), set(found))
+        self.assertNotIn("name", FileStorage._FileStorage__attr_indexes
+                         .get("City", {}))
+        self.assertEqual({}, models.storage.lookup("MyModel", "name", "x"))
+
+
+class TestFileStorageQuery(unittest.TestCase):
+    """
+    Unit testing queries of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = [Place(), Place(), Place(), Place()]
+        for guests, place in zip((2, 6, 4, 8), self.places):
+            place.city_id = "nairobi"
+            place.max_guest = guests
+        self.places[3].city_id = "mombasa"
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testQueryConditions(self):
+        query = models.storage.query(Place).where("max_guest", ">=", 4)
+        self.assertEqual({p.id for p in self.places[1:]},
+                         {p.id for p in query})
+        query = query.where(city_id="nairobi")
+        self.assertEqual({p.id for p in self.places[1:3]},
+                         {p.id for p in query})
+        self.assertEqual([], list(models.storage.query("MyModel")))
+        with self.assertRaises(ValueError):
+            query.where("max_guest", "=~", 4)
+
+    def testQueryUsesIndex(self):
+        query = models.storage.query("Place").where(city_id="mombasa")
+        with patch.object(FileStorage, "all",
+                          side_effect=AssertionError("scanned")):
+            self.assertEqual([self.places[3].id], [p.id for p in query])
+
+    def testQueryOrderAndLimit(self):
+        query = models.storage.query(Place).order_by("max_guest")
+        self.assertEqual([2, 4, 6, 8], [p.max_guest for p in query])
+        self.assertEqual([8, 6], [p.max_guest for p in
+                                  query.order_by("max_guest", True).limit(2)])
+        self.assertEqual(3, len(list(query.limit(3))))
+        self.places[0].max_guest = "many"
+        self.assertEqual([4, 6, 8, "many"], [p.max_guest for p in query])
+
+    def testQueryIsLazy(self):
+        query = models.storage.query(Place).where("max_guest", ">", 5)
+        place = Place()
+        place.max_guest = 10
+        self.assertIn(place.id, [p.id for p in query])
+
+
+class TestFileStorageRanges(unittest.TestCase):
+    """
+    Unit testing sorted range indexes of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = [Place() for price in range(5)]
+        for price, place in zip((300, 100, 500, 200, 400), self.places):
+            place.price_by_night = price
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def prices(self, objs):
+        return [obj.price_by_night for obj in objs]
+
+    def testBetween(self):
+        between = models.storage.between
+        self.assertEqual([200, 300, 400],
+                         self.prices(between(Place, "price_by_night",
+                                             200, 400)))
+        self.assertEqual([300], self.prices(between(
+            "Place", "price_by_night", 200, 400, include_low=False,
+            include_high=False)))
+        self.assertEqual([500, 400], self.prices(between(
+            Place, "price_by_night", 350, reverse=True)))
+        indexes = FileStorage._FileStorage__range_indexes
+        self.assertIn("price_by_night", indexes["Place"])
+        self.assertEqual([], list(between("MyModel", "price_by_night")))
+
+    def testBetweenFollowsUpdates(self):
+        models.storage.between(Place, "price_by_night")
+        self.places[0].price_by_night = 50
+        self.places[1].price_by_night = "free"
+        models.storage.delete(self.places[2])
+        place = Place()
+        place.price_by_night = 250
+        self.assertEqual([50, 200, 250, 400], self.prices(
+            models.storage.between(Place, "price_by_night")))
+
+    def testBetweenManySharedValues(self):
+        list(models.storage.between(Place, "price_by_night"))
+        places = [Place() for i in range(3000)]
+        for i, place in enumerate(places):
+            place.price_by_night = i % 7
+        index = FileStorage._FileStorage__range_indexes["Place"]
+        self.assertGreater(len(index["price_by_night"].blocks), 1)
+        found = self.prices(models.storage.between(Place, "price_by_night",
+                                                   2, 3))
+        self.assertEqual([2] * 429 + [3] * 429, found)
+        for place in places:
+            models.storage.delete(place)
+        self.assertEqual([100, 200, 300, 400, 500], self.prices(
+            models.storage.between(Place, "price_by_night")))
+
+    def testBetweenUnrangedAttribute(self):
+        self.places[1].latitude = 1.5
+        self.assertEqual([self.places[1].id], [p.id for p in (
+            models.storage.between(Place, "latitude", 1))])
+        self.assertNotIn("latitude", FileStorage._FileStorage__range_indexes
+                         .get("Place", {}))
+
+    def testQueryRangeAndTopK(self):
+        query = models.storage.query(Place)
+        cheap = query.where("price_by_night", "<", 300)
+        self.assertEqual({100, 200}, set(self.prices(cheap)))
+        top = query.order_by("price_by_night", True).limit(2)
+        with patch.object(FileStorage, "all",
+                          side_effect=AssertionError("scanned")):
+            self.assertEqual([500, 400], self.prices(top))
+            self.assertEqual([100, 200], self.prices(cheap.order_by(
+                "price_by_night")))
+        self.places[0].price_by_night = "ask"
+        self.assertEqual([500, 400, 200, 100, "ask"],
+                         self.prices(query.order_by("price_by_night", True)))
+
+    def testQueryRangeLimitStopsEarly(self):
+        between = FileStorage.between
+        taken = []
+
+        def counted(*args, **kwargs):
+            for obj in between(models.storage, *args, **kwargs):
+                taken.append(obj)
+                yield obj
+        with patch.object(FileStorage, "between", side_effect=counted):
+            found = list(models.storage.query(Place).where(
+                "price_by_night", ">=", 0).limit(1))
+        self.assertEqual([100], self.prices(found))
+        self.assertEqual(1, len(taken))
+
+
+class TestFileStorageGeo(unittest.TestCase):
+    """
+    Unit testing the spatial index of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = {}
+        for lat in range(-85, 90, 10):
+            for lon in range(-175, 180, 20):
+                place = Place()
+                place.latitude, place.longitude = lat + 0.5, lon + 0.25
+                self.places[place.id] = place
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def distance(self, lat, lon, place):
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        lat2, lon2 = (math.radians(place.latitude),
+                      math.radians(place.longitude))
+        h = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) *
+             math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+        return 2 * math.asin(math.sqrt(h))
+
+    def testPlacesNear(self):
+        for lat, lon, k in ((0, 0, 5), (89, 10, 7), (-30, 179.9, 3),
+                            (45, -100, 1)):
+            found = models.storage.places_near(lat, lon, k)
+            expected = sorted(self.places.values(),
+                              key=lambda p: self.distance(lat, lon, p))[:k]
+            self.assertEqual([p.id for p in expected], [p.id for p in found])
+        self.assertEqual([], models.storage.near(City, 0, 0, 3))
+        self.assertEqual(0, len(models.storage.places_near(0, 0, 0)))
+
+    def testNearFollowsUpdates(self):
+        models.storage.places_near(0, 0)
+        place = next(iter(self.places.values()))
+        place.latitude, place.longitude = 10.0, 20.0
+        self.assertIs(place, models.storage.places_near(10, 20, 1)[0])
+        models.storage.delete(place)
+        self.assertIsNot(place, models.storage.places_near(10, 20, 1)[0])
+
+    def testWithin(self):
+        found = models.storage.within(Place, -10, -20, 10, 20)
+        self.assertEqual({(-4.5, -14.75), (-4.5, 5.25), (5.5, -14.75),
+                          (5.5, 5.25)},
+                         {(p.latitude, p.longitude) for p in found})
+        found = models.storage.within("Place", 0, 160, 10, -170)
+        self.assertEqual({(5.5, 165.25), (5.5, -174.75)},
+                         {(p.latitude, p.longitude) for p in found})
+
+
+class TestFileStorageSearch(unittest.TestCase):
+    """
+    Unit testing the full-text index of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.reviews = [Review(), Review(), Review()]
+        self.reviews[0].text = "Quiet flat with a sunny balcony"
+        self.reviews[1].text = "Noisy street, but the balcony is nice"
+        self.reviews[2].text = "Quiet, quiet, quiet. Loved it"
+
+    def tearDown(self):
+        for path in ("file.json", "file.json.search",
+                     "file.json.search.stamp"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def ids(self, objs):
+        return [obj.id for obj in objs]
+
+    def testSearchRanks(self):
+        found = models.storage.search(Review, "quiet balcony")
+        self.assertEqual(self.reviews[0].id, found[0].id)
+        self.assertEqual(3, len(found))
+        self.assertEqual(self.ids(found[:1]), self.ids(
+            models.storage.search("Review", "QUIET Balcony!", 1)))
+        self.assertEqual([], models.storage.search(Review, "pool"))
+        self.assertEqual([], models.storage.search(User, "quiet"))
+
+    def testSearchFollowsUpdates(self):
+        models.storage.search(Review, "quiet")
+        self.reviews[1].text = "Quiet at night"
+        models.storage.delete(self.reviews[2])
+        place = Place()
+        place.name = "Quiet cottage"
+        self.assertEqual({self.reviews[0].id, self.reviews[1].id},
+                         set(self.ids(models.storage.search(Review,
+                                                            "quiet"))))
+        self.assertEqual([place.id], self.ids(
+            models.storage.search(Place, "cottage")))
+
+    def testSearchIndexIsPersisted(self):
+        models.storage.search(Review, "quiet")
+        models.storage.save()
+        self.assertTrue(os.path.isfile("file.json.search"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with patch.object(TextIndex, "add",
+                          side_effect=AssertionError("indexed")):
+            found = models.storage.search(Review, "balcony")
+        self.assertEqual({self.reviews[0].id, self.reviews[1].id},
+                         set(self.ids(found)))
+
+    def testSearchIndexCatchesUpChanges(self):
+        models.storage.search(Review, "quiet")
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        review = models.storage.all()["Review." + self.reviews[1].id]
+        review.text = "A pool and a garden"
+        models.storage.delete(models.storage.all()[
+            "Review." + self.reviews[0].id])
+        self.assertEqual([review.id], self.ids(
+            models.storage.search(Review, "pool")))
+        self.assertEqual([], models.storage.search(Review, "balcony"))
+
+    def testStaleSearchIndexIsRebuilt(self):
+        models.storage.search(Review, "quiet")
+        models.storage.save()
+        with open("file.json", "a") as f:
+            f.write(" ")
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        found = models.storage.search(Review, "balcony")
+        self.assertEqual(2, len(found))
+
+    def testUnrelatedSaveKeepsSearchIndex(self):
+        models.storage.search(Review, "quiet")
+        models.storage.save()
+        mtime = os.stat("file.json.search").st_mtime_ns
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with patch.object(TextIndex, "__init__",
+                          side_effect=AssertionError("loaded")):
+            User().save()
+        self.assertEqual(mtime, os.stat("file.json.search").st_mtime_ns)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with patch.object(TextIndex, "add",
+                          side_effect=AssertionError("indexed")):
+            found = models.storage.search(Review, "balcony")
+        self.assertEqual(2, len(found))
+
+
+class TestFileStorageAmenities(unittest.TestCase):
+    """
+    Unit testing the amenity bitmap index of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = [Place() for i in range(4)]
+        for ids, place in zip((["wifi", "pool"], ["wifi"], [],
+                               ["pool", "wifi", "gym"]), self.places):
+            place.amenity_ids = ids
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def ids(self, objs):
+        return {obj.id for obj in objs.values()}
+
+    def testSaveKeepsListChangedInPlace(self):
+        place = self.places[0]
+        models.storage.save()
+        place.amenity_ids.append("spa")
+        self.assertIn('"spa"', place.to_json())
+        self.assertIn("'spa'", str(place))
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        loaded = models.storage.all()["Place." + place.id]
+        self.assertIn("spa", loaded.amenity_ids)
+
+    def testPlacesHaving(self):
+        having = models.storage.places_having
+        places = self.places
+        self.assertEqual({places[0].id, places[3].id},
+                         self.ids(having(["pool", "wifi"])))
+        self.assertEqual({places[3].id}, self.ids(having(["gym", "wifi"])))
+        self.assertEqual({p.id for p in places}, self.ids(having([])))
+        self.assertEqual({}, having(["wifi", "sauna"]))
+        self.assertEqual({}, models.storage.having("MyModel", "ids", []))
+        indexes = FileStorage._FileStorage__bitmap_indexes
+        self.assertIn("amenity_ids", indexes["Place"])
+
+    def testHavingFollowsUpdates(self):
+        having = models.storage.places_having
+        having(["wifi"])
+        self.places[1].amenity_ids = ["pool"]
+        self.places[2].amenity_ids.append("wifi")
+        self.places[2].save()
+        models.storage.delete(self.places[0])
+        place = Place()
+        place.amenity_ids = ["wifi", "sauna"]
+        self.assertEqual({self.places[2].id, self.places[3].id, place.id},
+                         self.ids(having(["wifi"])))
+        self.assertEqual({self.places[1].id, self.places[3].id},
+                         self.ids(having(["pool"])))
+        self.assertEqual({place.id}, self.ids(having(["sauna", "wifi"])))
+
+    def testHavingUntaggedAttribute(self):
+        self.places[0].tags = ["quiet"]
+        self.assertEqual({self.places[0].id}, self.ids(
+            models.storage.having(Place, "tags", ["quiet"])))
+
+
+class TestFileStorageAggregates(unittest.TestCase):
+    """
+    Unit testing the columnar aggregates of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = [Place() for i in range(4)]
+        for price, city, place in zip((100, 300, 200, "ask"),
+                                      ("a", "b", "a", "a"), self.places):
+            place.price_by_night, place.city_id = price, city
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testAggregate(self):
+        aggregate = models.storage.aggregate
+        self.assertEqual(3, aggregate(Place, "count", "price_by_night"))
+        self.assertEqual(600.0, aggregate(Place, "sum", "price_by_night"))
+        self.assertEqual(200.0, aggregate("Place", "avg", "price_by_night"))
+        self.assertEqual(100.0, aggregate(Place, "min", "price_by_night"))
+        self.assertEqual(300.0, aggregate(Place, "max", "price_by_night"))
+        self.assertEqual(150.0, aggregate(Place, "percentile",
+                                          "price_by_night", 25))
+        self.assertEqual([1, 1, 1], aggregate(Place, "histogram",
+                                              "price_by_night", 3)[0])
+        self.assertEqual({"a": 150.0, "b": 300.0},
+                         aggregate(Place, "avg", "price_by_night",
+                                   group_by="city_id"))
+        self.assertIn("Place", FileStorage._FileStorage__columns)
+        self.assertIsNone(aggregate("MyModel", "avg", "price_by_night"))
+        with self.assertRaises(ValueError):
+            aggregate(Place, "median", "price_by_night")
+
+    def testAggregateFollowsUpdates(self):
+        aggregate = models.storage.aggregate
+        aggregate(Place, "sum", "price_by_night")
+        self.places[3].price_by_night = 400
+        models.storage.delete(self.places[0])
+        place = Place()
+        place.price_by_night = 50
+        self.assertEqual(950.0, aggregate(Place, "sum", "price_by_night"))
+        self.assertEqual({"": 50.0, "a": 600.0, "b": 300.0},
+                         aggregate(Place, "sum", "price_by_night",
+                                   group_by="city_id"))
+
+    def testCountGroupBy(self):
+        self.assertEqual({"a": 3, "b": 1},
+                         models.storage.count(Place, group_by="city_id"))
+        self.assertEqual({100: 1, 300: 1, 200: 1, "ask": 1},
+                         models.storage.count("Place",
+                                              group_by="price_by_night"))
+        self.assertEqual({}, models.storage.count("MyModel", group_by="id"))
+
+    def testAggregateOtherAttribute(self):
+        self.places[0].rating = 4.5
+        self.places[1].rating = 3.5
+        self.assertEqual(4.0, models.storage.aggregate(Place, "avg",
+                                                       "rating"))
+        self.assertEqual({100.0: 4.5, 300.0: 3.5, 200.0: None,
+                          "ask": None},
+                         models.storage.aggregate(Place, "max", "rating",
+                                                  group_by="price_by_night"))
+
+
+class TestFileStorageCompact(unittest.TestCase):
+    """
+    Unit testing the compact mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__compact = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__compact = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def testReloadBuildsCompactObjects(self):
+        place = Place()
+        place.amenity_ids = ["wifi", "pool"]
+        place.price_by_night = 120
+        place.rating = 4.5
+        models.storage.save()
+        models.storage.reload()
+        loaded = models.storage.all()["Place." + place.id]
+        self.assertIs(Place.compact(), type(loaded))
+        self.assertEqual(place.to_dict(), loaded.to_dict())
+        self.assertEqual(str(place), str(loaded))
+        self.assertEqual(["Place." + place.id],
+                         list(models.storage.places_having(["pool"])))
+        loaded.name = "Loft"
+        models.storage.save()
+        models.storage.reload()
+        loaded = models.storage.all()["Place." + place.id]
+        self.assertEqual("Loft", loaded.name)
+        self.assertEqual(4.5, loaded.rating)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Defines unit tests for models/engine/json_stream.py.
+
+Unittest classes:
+    TestIterEntries
+"""
+
+import json
+import unittest
+from io import StringIO
+from models.engine.json_stream import iter_entries
+
+
+class TestIterEntries(unittest.TestCase):
+    """
+    Unit testing the iter_entries function.
+    """
+
+    def setUp(self):
+        self.objs = {
+            "User.1": {"id": "1", "first_name": "Betty", "age": 98},
+            "Place.2": {"id": "2", "text": "a \"quoted\" {brace}, é",
+                        "amenity_ids": ["3", "4"], "price": 12.5},
+            "State.3": {}
+        }
+
+    def testEmptyObject(self):
+        self.assertEqual([], list(iter_entries(StringIO("{}"))))
+        self.assertEqual([], list(iter_entries(StringIO(" {\n } "))))
+
+    def testDefaultLayout(self):
+        text = json.dumps(self.objs)
+        self.assertEqual(list(self.objs.items()),
+                         list(iter_entries(StringIO(text))))
+
+    def testOneEntryPerLineLayout(self):
+        text = json.dumps(self.objs, indent=1, separators=(",", ":"))
+        self.assertEqual(list(self.objs.items()),
+                         list(iter_entries(StringIO(text))))
+
+    def testSmallReads(self):
+        text = json.dumps(self.objs)
+        for size in (1, 2, 7):
+            self.assertEqual(list(self.objs.items()),
+                             list(iter_entries(StringIO(text), size)))
+
+    def testNumberSplitByRead(self):
+        text = '{"a": 12345, "b": 6}'
+        self.assertEqual([("a", 12345), ("b", 6)],
+                         list(iter_entries(StringIO(text), 8)))
+
+    def testIsLazy(self):
+        entries = iter_entries(StringIO('{"a": 1, "b": oops}'))
+        self.assertEqual(("a", 1), next(entries))
+        with self.assertRaises(ValueError):
+            next(entries)
+
+    def testTruncatedFile(self):
+        with self.assertRaises(ValueError):
+            list(iter_entries(StringIO('{"a": {"id": "1"')))
+        with self.assertRaises(ValueError):
+            list(iter_entries(StringIO('{"a": 1')))
+        with self.assertRaises(ValueError):
+            list(iter_entries(StringIO('')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.place import Place
+from models.review import Review
 
 
 class TestPlaceInitialization(unittest.TestCase):
@@ -101,6 +102,26 @@ class TestPlaceInitialization(unittest.TestCase):
         self.assertIn("amenity_ids", dir(place))
         self.assertNotIn("amenity_ids", place.__dict__)
 
+    def testAmenityIDsNotShared(self):
+        place1 = Place()
+        place2 = Place()
+        place1.amenity_ids.append("wifi")
+        self.assertEqual(["wifi"], place1.amenity_ids)
+        self.assertEqual([], place2.amenity_ids)
+        self.assertEqual([], Place.amenity_ids)
+
+    def testReadingAmenityIDsChangesNothing(self):
+        place = Place()
+        text, dictionary = str(place), place.to_dict()
+        ids = place.amenity_ids
+        self.assertEqual([], ids)
+        self.assertNotIn("amenity_ids", place.__dict__)
+        self.assertEqual(text, str(place))
+        self.assertEqual(dictionary, place.to_dict())
+        ids.append("wifi")
+        self.assertIs(ids, place.amenity_ids)
+        self.assertEqual(["wifi"], place.to_dict()["amenity_ids"])
+
     def testTwoPlacesUniqueIDs(self):
         place1 = Place()
         place2 = Place()
@@ -147,6 +168,22 @@ class TestPlaceInitialization(unittest.TestCase):
         with self.assertRaises(TypeError):
             Place(id=None, created_at=None, updated_at=None)
 
+    def testReviewsFollowsForeignKey(self):
+        place = Place()
+        reviews = [Review(), Review()]
+        reviews[0].place_id = place.id
+        self.assertEqual([reviews[0]], place.reviews)
+        reviews[1].place_id = place.id
+        self.assertCountEqual(reviews, place.reviews)
+        reviews[0].place_id = ""
+        self.assertEqual([reviews[1]], place.reviews)
+        models.storage.delete(reviews[1])
+        self.assertEqual([], place.reviews)
+
+    def testReviewsIsReadOnly(self):
+        with self.assertRaises(AttributeError):
+            Place().reviews = []
+
 
 class TestPlaceSave(unittest.TestCase):
     """
@@ -12,6 +12,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.city import City
 from models.state import State
 
 
@@ -87,6 +88,22 @@ class TestStateInitialization(unittest.TestCase):
         with self.assertRaises(TypeError):
             State(id=None, created_at=None, updated_at=None)
 
+    def testCitiesFollowsForeignKey(self):
+        state = State()
+        citys = [City(), City()]
+        citys[0].state_id = state.id
+        self.assertEqual([citys[0]], state.cities)
+        citys[1].state_id = state.id
+        self.assertCountEqual(citys, state.cities)
+        citys[0].state_id = ""
+        self.assertEqual([citys[1]], state.cities)
+        models.storage.delete(citys[1])
+        self.assertEqual([], state.cities)
+
+    def testCitiesIsReadOnly(self):
+        with self.assertRaises(AttributeError):
+            State().cities = []
+
 
 class TestStateSave(unittest.TestCase):
     """
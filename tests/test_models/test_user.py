@@ -12,6 +12,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.place import Place
 from models.user import User
 
 
@@ -92,6 +93,22 @@ class TestUserInitialization(unittest.TestCase):
         with self.assertRaises(TypeError):
             User(id=None, created_at=None, updated_at=None)
 
+    def testPlacesFollowsForeignKey(self):
+        user = User()
+        places = [Place(), Place()]
+        places[0].user_id = user.id
+        self.assertEqual([places[0]], user.places)
+        places[1].user_id = user.id
+        self.assertCountEqual(places, user.places)
+        places[0].user_id = ""
+        self.assertEqual([places[1]], user.places)
+        models.storage.delete(places[1])
+        self.assertEqual([], user.places)
+
+    def testPlacesIsReadOnly(self):
+        with self.assertRaises(AttributeError):
+            User().places = []
+
 
 class TestUserSave(unittest.TestCase):
     """